@@ -33,6 +33,23 @@ assert any(app in INSTALLED_APPS for app in ['posts.apps.PostsConfig', 'posts'])
     'Пожалуйста зарегистрируйте приложение в `settings.INSTALLED_APPS`'
 )
 
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def yatube_test_environment():
+    # То же, что TEST_RUNNER для manage.py test: см. core.testing
+    from core.testing import test_environment
+    with test_environment():
+        yield
+
+
+@pytest.fixture(autouse=True)
+def inline_image_worker(settings):
+    # Фоновый воркер не должен писать в MEDIA_ROOT после удаления временной папки
+    settings.IMAGE_WORKERS = 0
+
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
@@ -0,0 +1,151 @@
+import json
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+from posts.utils import MAX_DB_INT, NEXT, encode_cursor
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='api_user')
+        cls.group = Group.objects.create(
+            title='API group', slug='api-group', description='-'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Пост {number}',
+                group=cls.group if number % 2 else None,
+            )
+            for number in range(5)
+        ]
+        for number in range(3):
+            Comment.objects.create(
+                author=cls.user, post=cls.posts[0], text=f'Ответ {number}'
+            )
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        if response.streaming:
+            content = b''.join(response.streaming_content)
+        else:
+            content = response.content
+        return response, json.loads(content)
+
+    def test_posts_are_streamed_newest_first(self):
+        response, data = self.get(reverse('api:posts'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(
+            [item['id'] for item in data['results']],
+            [post.pk for post in reversed(self.posts)],
+        )
+        first = data['results'][-1]
+        self.assertEqual(first['author'], 'api_user')
+        self.assertIsNone(first['group'])
+        self.assertIsNone(first['image'])
+        self.assertEqual(first['comments_count'], 3)
+        self.assertIsNone(data['next'])
+
+    def test_cursor_walks_all_posts(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2, 'fields': 'id'}
+            if cursor:
+                params['cursor'] = cursor
+            _, data = self.get(reverse('api:posts'), **params)
+            seen += [item['id'] for item in data['results']]
+            cursor = data['next']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+
+    def test_sparse_fields(self):
+        _, data = self.get(reverse('api:posts'), fields='id,text', limit=1)
+        self.assertEqual(
+            data['results'], [{'id': self.posts[-1].pk, 'text': 'Пост 4'}]
+        )
+
+    def test_bad_parameters(self):
+        huge = SimpleNamespace(
+            pub_date=self.posts[0].pub_date, pk=MAX_DB_INT + 1
+        )
+        for params in (
+            {'fields': 'id,password'},
+            {'limit': 'many'},
+            {'cursor': 'garbage'},
+            {'cursor': encode_cursor(huge, NEXT)},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('api:posts'), params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', json.loads(response.content))
+
+    def test_group_posts(self):
+        url = reverse('api:group_posts', args=[self.group.slug])
+        _, data = self.get(url, fields='id,group')
+        self.assertEqual(
+            [item['id'] for item in data['results']],
+            [self.posts[3].pk, self.posts[1].pk],
+        )
+        missing = self.client.get(reverse('api:group_posts', args=['none']))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_comments_in_writing_order(self):
+        url = reverse('api:post_comments', args=[self.posts[0].pk])
+        _, data = self.get(url, fields='text,author')
+        self.assertEqual(
+            data['results'],
+            [{'text': f'Ответ {n}', 'author': 'api_user'} for n in range(3)],
+        )
+        missing = self.client.get(reverse('api:post_comments', args=[0]))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_list_is_one_query(self):
+        self.get(reverse('api:posts'))
+        with self.assertNumQueries(1):
+            self.get(reverse('api:posts'))
+
+    def test_not_modified(self):
+        response, _ = self.get(reverse('api:posts'))
+        again = self.client.get(
+            reverse('api:posts'), HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(again.status_code, 304)
+        Post.objects.create(author=self.user, text='Новый пост')
+        fresh = self.client.get(
+            reverse('api:posts'), HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(fresh.status_code, 200)
+
+    def test_new_comment_changes_list_etag(self):
+        urls = (
+            reverse('api:posts'),
+            reverse('api:group_posts', args=[self.group.slug]),
+        )
+        etags = {}
+        for url in urls:
+            self.get(url)
+            etags[url] = self.get(url)[0]['ETag']
+        narrow, _ = self.get(urls[0], fields='id,text')
+        Comment.objects.create(
+            author=self.user, post=self.posts[3], text='Новый ответ'
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+        # Без comments_count в ответе комментарий ETag не меняет
+        again = self.client.get(
+            urls[0], {'fields': 'id,text'}, HTTP_IF_NONE_MATCH=narrow['ETag']
+        )
+        self.assertEqual(again.status_code, 304)
@@ -0,0 +1,23 @@
+from django.urls import path
+
+from . import views
+
+
+app_name = 'api'
+
+urlpatterns = [
+    # Лента всех постов
+    path('posts/', views.posts, name='posts'),
+    # Посты группы
+    path(
+        'groups/<slug:slug>/posts/',
+        views.group_posts,
+        name='group_posts'
+    ),
+    # Комментарии к посту в порядке написания
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
+]
@@ -0,0 +1,114 @@
+"""
+Сериализация для API без моделей: строки берутся через values() и
+iterator(), пагинация — курсором по (pub_date, id), ответ отдаётся кусками.
+"""
+from types import SimpleNamespace
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from posts.utils import NEXT, decode_cursor, encode_cursor
+from yatube.settings import API_MAX_LIMIT, PAGE_POSTS_COUNT
+
+# Публичное имя поля -> путь для values()
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+}
+# Поля курсора выбираются всегда, даже если их не просили
+KEY_FIELDS = ('pub_date', 'id')
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def select_fields(param, available):
+    """?fields=a,b -> {имя: путь}; без параметра — все поля."""
+    if not param:
+        return dict(available)
+    names = [name.strip() for name in param.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ApiError(400, f'Неизвестные поля: {", ".join(unknown)}')
+    return {name: available[name] for name in names}
+
+
+def parse_limit(param):
+    if param is None:
+        return PAGE_POSTS_COUNT
+    try:
+        limit = int(param)
+    except ValueError:
+        raise ApiError(400, 'limit должен быть числом')
+    return min(max(limit, 1), API_MAX_LIMIT)
+
+
+def keyset(queryset, cursor, descending=True):
+    """Упорядочивает по (pub_date, id) и отрезает записи до курсора."""
+    if descending:
+        queryset = queryset.order_by('-pub_date', '-id')
+    else:
+        queryset = queryset.order_by('pub_date', 'id')
+    if not cursor:
+        return queryset
+    decoded = decode_cursor(cursor)
+    if decoded is None or decoded[0] != NEXT:
+        raise ApiError(400, 'Некорректный курсор')
+    _, pub_date, pk = decoded
+    if descending:
+        return queryset.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+        )
+    return queryset.filter(
+        Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+    )
+
+
+def _media_url(name):
+    return default_storage.url(name) if name else None
+
+
+# Значения, которые в JSON отдаются не так, как лежат в базе
+CONVERTERS = {'image': _media_url}
+
+
+def stream(queryset, fields, limit):
+    """
+    Куски JSON {"results": [...], "next": курсор}. Берётся на одну строку
+    больше limit: по ней понятно, есть ли следующая страница.
+    """
+    paths = list(dict.fromkeys([*fields.values(), *KEY_FIELDS]))
+    rows = queryset.values(*paths)[:limit + 1].iterator()
+    encoder = DjangoJSONEncoder()
+    next_cursor = None
+    last = None
+    yield '{"results": ['
+    for index, row in enumerate(rows):
+        if index == limit:
+            next_cursor = encode_cursor(
+                SimpleNamespace(pub_date=last['pub_date'], pk=last['id']),
+                NEXT,
+            )
+            break
+        item = {}
+        for name, path in fields.items():
+            convert = CONVERTERS.get(name)
+            item[name] = convert(row[path]) if convert else row[path]
+        yield (',' if index else '') + encoder.encode(item)
+        last = row
+    yield f'], "next": {encoder.encode(next_cursor)}}}'
@@ -0,0 +1,88 @@
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from posts import caching
+from posts.models import Comment, Group, Post
+from .utils import (
+    COMMENT_FIELDS, POST_FIELDS, ApiError, keyset, parse_limit,
+    select_fields, stream,
+)
+
+
+def _count_scopes(request):
+    """Без ?fields= или с comments_count ответ меняет любой комментарий."""
+    fields = request.GET.get('fields')
+    if fields and 'comments_count' not in (
+        name.strip() for name in fields.split(',')
+    ):
+        return ()
+    return (caching.COMMENT_COUNTS,)
+
+
+def _index_scopes(request):
+    return (caching.INDEX, *_count_scopes(request))
+
+
+def _group_scopes(request, slug):
+    group_id = caching.known_id('group', slug)
+    return group_id and (
+        caching.group_scope(group_id), *_count_scopes(request)
+    )
+
+
+def _comments_scopes(request, post_id):
+    return (caching.post_scope(post_id),)
+
+
+def _error(status, message):
+    return JsonResponse({'detail': message}, status=status)
+
+
+def _list(request, queryset, available, descending=True):
+    """Страница списка: ?fields=, ?limit= и ?cursor= из запроса."""
+    try:
+        fields = select_fields(request.GET.get('fields'), available)
+        limit = parse_limit(request.GET.get('limit'))
+        queryset = keyset(queryset, request.GET.get('cursor'), descending)
+    except ApiError as error:
+        return _error(error.status, str(error))
+    return StreamingHttpResponse(
+        stream(queryset, fields, limit), content_type='application/json'
+    )
+
+
+@require_GET
+@caching.conditional(_index_scopes)
+def posts(request):
+    return _list(request, Post.objects.all(), POST_FIELDS)
+
+
+@require_GET
+@caching.conditional(_group_scopes)
+def group_posts(request, slug):
+    group_id = caching.known_id('group', slug)
+    if group_id is None:
+        group_id = Group.objects.filter(slug=slug).values_list(
+            'pk', flat=True
+        ).first()
+        if group_id is None:
+            return _error(404, 'Группа не найдена')
+        caching.remember_id('group', slug, group_id)
+    return _list(request, Post.objects.filter(group_id=group_id), POST_FIELDS)
+
+
+@require_GET
+@caching.conditional(_comments_scopes)
+def post_comments(request, post_id):
+    if caching.known_id('post_author', post_id) is None:
+        author_id = Post.objects.filter(pk=post_id).values_list(
+            'author_id', flat=True
+        ).first()
+        if author_id is None:
+            return _error(404, 'Пост не найден')
+        caching.remember_id('post_author', post_id, author_id)
+    # Комментарии читаются в порядке написания, как на странице поста
+    return _list(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        descending=False,
+    )
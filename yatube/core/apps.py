@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import timing
+        from .db import configure_sqlite
+        connection_created.connect(configure_sqlite)
+        if settings.SERVER_TIMING:
+            timing.install()
@@ -0,0 +1,234 @@
+"""
+Сборка статики: отпечатки в именах, урезанный Bootstrap, сжатые копии.
+
+build() копирует файлы всех finders в STATIC_ROOT под исходным и под
+хешированным именем, выкидывает из CSS правила с неиспользуемыми классами,
+кладёт рядом .gz (и .br, если установлен brotli) и пишет манифест в формате
+ManifestStaticFilesStorage, поэтому {% static %} сразу отдаёт новые имена.
+"""
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST_NAME = 'staticfiles.json'
+COMPRESSIBLE = ('.css', '.js', '.svg', '.map', '.ico', '.txt', '.json')
+# name.0123456789ab.ext — содержимое такого файла никогда не меняется
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}(\.[^./]+)?$')
+IGNORE_PATTERNS = ['CVS', '.*', '*~']
+# qvalue из RFC 7231; всё остальное считается q=0
+QVALUE = re.compile(r'0(\.\d{0,3})?|1(\.0{0,3})?')
+
+
+class AssetStorage(ManifestStaticFilesStorage):
+    """
+    Имена для {% static %} из манифеста build_static; файлы не из манифеста
+    (например, пока сборка не запускалась) отдаются по исходному имени.
+    """
+
+    def stored_name(self, name):
+        key = self.hash_key(self.clean_name(name))
+        return self.hashed_files.get(key, name)
+
+
+def _split_rules(css):
+    """Правила верхнего уровня: (заголовок, тело) или (at-правило, None)."""
+    rules = []
+    depth = start = brace = 0
+    quote = None
+    for i, char in enumerate(css):
+        if quote:
+            if char == quote and css[i - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            if depth == 0:
+                brace = i
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append((css[start:brace].strip(), css[brace + 1:i]))
+                start = i + 1
+        elif char == ';' and depth == 0:
+            rules.append((css[start:i].strip(), None))
+            start = i + 1
+    return rules
+
+
+def _split_selectors(prelude):
+    selectors = []
+    depth = start = 0
+    for i, char in enumerate(prelude):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(prelude[start:i])
+            start = i + 1
+    selectors.append(prelude[start:])
+    return selectors
+
+
+def _selector_used(selector, used):
+    # Классы внутри :not(...) и атрибутов не обязаны быть на странице
+    while True:
+        stripped = re.sub(r'\([^()]*\)|\[[^\[\]]*\]', '', selector)
+        if stripped == selector:
+            break
+        selector = stripped
+    classes = re.findall(r'\.(-?[A-Za-z_][\w-]*)', selector)
+    return all(name in used for name in classes)
+
+
+def _purge_rules(css, used):
+    result = []
+    for prelude, body in _split_rules(css):
+        if body is None:
+            result.append(f'{prelude};')
+        elif prelude.startswith(('@media', '@supports')):
+            inner = _purge_rules(body, used)
+            if inner:
+                result.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            result.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [
+                selector for selector in _split_selectors(prelude)
+                if _selector_used(selector, used)
+            ]
+            if selectors:
+                result.append(f"{','.join(selectors)}{{{body}}}")
+    return ''.join(result)
+
+
+def purge_css(css, used):
+    """
+    Убирает правила, все селекторы которых ссылаются на классы не из used.
+    Лицензионные комментарии /*! ... */ сохраняются, остальные (в том
+    числе sourceMappingURL, карта к урезанному файлу уже не подходит)
+    выбрасываются.
+    """
+    licenses = ''.join(re.findall(r'/\*!.*?\*/', css, re.S))
+    css = _purge_rules(re.sub(r'/\*.*?\*/', '', css, flags=re.S), used)
+    # @charset обязан оставаться самым первым
+    if css.startswith('@charset'):
+        charset, _, css = css.partition(';')
+        return f'{charset};{licenses}{css}'
+    return licenses + css
+
+
+def template_words():
+    """Все слова из шаблонов проекта — надмножество используемых классов."""
+    dirs = [
+        directory for config in settings.TEMPLATES
+        for directory in config.get('DIRS', [])
+    ]
+    dirs += [
+        os.path.join(config.path, 'templates')
+        for config in apps.get_app_configs()
+        if config.path.startswith(settings.BASE_DIR)
+    ]
+    words = set(settings.STATIC_PURGE_SAFELIST)
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                with open(os.path.join(root, name), encoding='utf-8') as f:
+                    words.update(re.findall(r'[A-Za-z][\w-]*', f.read()))
+    return words
+
+
+def hashed_name(path, content):
+    root, ext = posixpath.splitext(path)
+    return f'{root}.{hashlib.md5(content).hexdigest()[:12]}{ext}'
+
+
+def _write(root, path, content):
+    filename = os.path.join(root, *path.split('/'))
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, 'wb') as f:
+        f.write(content)
+    if not path.endswith(COMPRESSIBLE):
+        return
+    variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(content)))
+    for suffix, compressed in variants:
+        # Сжатая копия нужна, только если она меньше оригинала
+        if len(compressed) < len(content):
+            with open(filename + suffix, 'wb') as f:
+                f.write(compressed)
+
+
+def collect():
+    """Исходные файлы всех finders; при совпадении имён побеждает первый."""
+    found = {}
+    for finder in get_finders():
+        for path, storage in finder.list(IGNORE_PATTERNS):
+            path = path.replace(os.sep, '/')
+            if path not in found:
+                with storage.open(path) as f:
+                    found[path] = f.read()
+    return found
+
+
+def build(root=None):
+    """Собирает статику в root (STATIC_ROOT) и возвращает манифест."""
+    root = root or settings.STATIC_ROOT
+    used = template_words()
+    manifest = {}
+    for path, content in sorted(collect().items()):
+        if path in settings.STATIC_PURGE_CSS:
+            content = purge_css(content.decode('utf-8'), used).encode('utf-8')
+        manifest[path] = hashed_name(path, content)
+        _write(root, path, content)
+        _write(root, manifest[path], content)
+    with open(os.path.join(root, MANIFEST_NAME), 'w') as f:
+        json.dump({'paths': manifest, 'version': '1.0'}, f, indent=1)
+    return manifest
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding с ненулевым q."""
+    accepted = set()
+    for part in header.split(','):
+        name, *params = part.split(';')
+        if name.strip() and _quality(params) > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _quality(params):
+    for param in params:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'q':
+            value = value.strip()
+            return float(value) if QVALUE.fullmatch(value) else 0
+    return 1
+
+
+def pick_encoding(filename, header):
+    """Файл для отдачи: .br или .gz, если клиент их принимает и они есть."""
+    accepted = accepted_encodings(header)
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if encoding in accepted and os.path.isfile(filename + suffix):
+            return filename + suffix, encoding
+    return filename, None
+
+
+def is_hashed(path):
+    return HASHED_NAME.search(path) is not None
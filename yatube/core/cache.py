@@ -0,0 +1,203 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class SQLiteCache(BaseCache):
+    """
+    Кеш в файле SQLite, общий для всех процессов WSGI.
+
+    Каждая запись — отдельная транзакция, поэтому она атомарна и сразу
+    видна другим процессам. При переполнении вытесняются давно не читанные
+    записи: время чтения обновляется не чаще раза в TOUCH_INTERVAL секунд,
+    чтобы чтение почти никогда не превращалось в запись.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = os.path.abspath(location)
+        options = params.get('OPTIONS', {})
+        self._touch_interval = float(options.get('TOUCH_INTERVAL', 1))
+        self._local = threading.local()
+
+    def _connection(self):
+        # Соединение своё у каждого потока и не переживает fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None
+            )
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'expires REAL, accessed REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    @staticmethod
+    def _alive(expires, now):
+        return expires is None or expires > now
+
+    def _touch_stale(self, conn, keys, now):
+        if keys:
+            conn.execute(
+                'UPDATE cache SET accessed = ? WHERE key IN (%s)'
+                % ', '.join('?' * len(keys)),
+                (now, *keys),
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._get_many([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        key_map = {self._key(key, version): key for key in keys}
+        found = self._get_many(list(key_map))
+        return {key_map[key]: value for key, value in found.items()}
+
+    def _get_many(self, keys):
+        if not keys:
+            return {}
+        now = time.time()
+        conn = self._connection()
+        rows = conn.execute(
+            'SELECT key, value, expires, accessed FROM cache '
+            'WHERE key IN (%s)' % ', '.join('?' * len(keys)),
+            keys,
+        ).fetchall()
+        found = {}
+        stale = []
+        for key, value, expires, accessed in rows:
+            if not self._alive(expires, now):
+                continue
+            found[key] = pickle.loads(value)
+            if now - accessed > self._touch_interval:
+                stale.append(key)
+        self._touch_stale(conn, stale, now)
+        return found
+
+    def _insert(self, conn, key, value, timeout, now):
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires, accessed) '
+            'VALUES (?, ?, ?, ?)',
+            (key, pickle.dumps(value, self.pickle_protocol),
+             self.get_backend_timeout(timeout), now),
+        )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self._transaction() as conn:
+            for key, value in data.items():
+                self._insert(
+                    conn, self._key(key, version), value, timeout, now
+                )
+            self._cull(conn, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and self._alive(row[0], now):
+                return False
+            self._insert(conn, key, value, timeout, now)
+            self._cull(conn, now)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or not self._alive(row[1], now):
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            conn.execute(
+                'UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+                (pickle.dumps(value, self.pickle_protocol), now, key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as conn:
+            return conn.execute(
+                'UPDATE cache SET expires = ?, accessed = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), now, key, now),
+            ).rowcount > 0
+
+    def has_key(self, key, version=None):
+        return self.get(key, self, version) is not self
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            with self._transaction() as conn:
+                conn.execute(
+                    'DELETE FROM cache WHERE key IN (%s)'
+                    % ', '.join('?' * len(keys)),
+                    keys,
+                )
+
+    def clear(self):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM cache')
+
+    def _cull(self, conn, now):
+        count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        conn.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            conn.execute('DELETE FROM cache')
+            return
+        conn.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (count // self._cull_frequency,),
+        )
@@ -0,0 +1,108 @@
+"""
+SQLite в продакшене: PRAGMA для каждого соединения и очередь записи.
+
+configure_sqlite() подключается к connection_created и выставляет
+SQLITE_PRAGMAS: WAL, чтобы читатели не мешали писателю, busy_timeout,
+mmap и кеш страниц. WriteQueue выполняет записи по одной в отдельном
+потоке: у SQLite всё равно один писатель, а ожидание в очереди процесса
+дешевле и предсказуемее, чем борьба за блокировку файла.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+from . import replicas
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    # Напрямую через sqlite3, чтобы PRAGMA не попадали в счётчики запросов
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked(error):
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+class WriteQueue:
+    """
+    Выполняет функции в отдельном потоке записи, каждую в своей
+    транзакции. Если база всё же занята (другой процесс), транзакция
+    повторяется до retries раз с экспоненциальной паузой.
+    """
+
+    def __init__(self, retries=3, backoff=0.05):
+        self.retries = retries
+        self.backoff = backoff
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._work, name='sqlite-writer', daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Выполняет func в потоке записи и возвращает её результат."""
+        if threading.current_thread() is self._thread:
+            # Вложенная запись уже внутри транзакции потока записи
+            return func(*args, **kwargs)
+        self._ensure_thread()
+        future = Future()
+        self._jobs.put((future, func, args, kwargs))
+        return future.result()
+
+    def _work(self):
+        while True:
+            future, func, args, kwargs = self._jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._run(func, args, kwargs))
+            except BaseException as error:
+                future.set_exception(error)
+
+    def _run(self, func, args, kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if not is_locked(error) or attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+
+write_queue = WriteQueue(retries=settings.SQLITE_WRITE_RETRIES)
+
+
+def serialized(func):
+    """
+    Функция записи выполняется через write_queue, если включён
+    SQLITE_WRITE_QUEUE; иначе вызывается как обычно. Оборачивать стоит
+    только работу с ORM: проверка форм и разбор картинок в потоке записи
+    задерживали бы всех остальных писателей. О записи в потоке записи
+    узнаёт и ReplicaPinMiddleware потока запроса.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not settings.SQLITE_WRITE_QUEUE:
+            return func(*args, **kwargs)
+        result, wrote = write_queue.submit(
+            replicas.on_primary, func, *args, **kwargs
+        )
+        if wrote:
+            replicas.note_write()
+        return result
+    return wrapper
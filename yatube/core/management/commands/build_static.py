@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import assets
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает статику в STATIC_ROOT: хеши в именах, урезанный '
+        'Bootstrap, сжатые копии и манифест'
+    )
+
+    def handle(self, *args, **options):
+        manifest = assets.build()
+        if assets.brotli is None:
+            self.stdout.write('brotli не установлен, собраны только .gz')
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов: {len(manifest)}, каталог: {settings.STATIC_ROOT}'
+        ))
@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Пишет пульс в основную базу и копирует её в SQLite-реплики; '
+        'с --check только показывает отставание реплик'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять каждые N секунд, пока команду не остановят',
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Не копировать, а вывести отставание каждой реплики',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            return self.check_lag()
+        while True:
+            self.sync()
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sync(self):
+        primary = connections[replicas.PRIMARY]
+        replicas.write_heartbeat(primary)
+        for alias in settings.DATABASE_REPLICAS:
+            replica = connections[alias]
+            # Остальные реплики обновляет репликация самой СУБД
+            if replica.vendor != 'sqlite' or primary.vendor != 'sqlite':
+                continue
+            replica.close()
+            replicas.copy_sqlite(
+                primary.settings_dict['NAME'], replica.settings_dict['NAME']
+            )
+            self.stdout.write(f'{alias}: скопирована')
+
+    def check_lag(self):
+        for alias in settings.DATABASE_REPLICAS:
+            lag = replicas.replica_lag(alias)
+            if lag is None:
+                self.stdout.write(self.style.ERROR(f'{alias}: нет пульса'))
+            elif lag > settings.REPLICA_MAX_LAG:
+                self.stdout.write(self.style.WARNING(
+                    f'{alias}: отставание {lag:.1f} с, чтения не получает'
+                ))
+            else:
+                self.stdout.write(f'{alias}: отставание {lag:.1f} с')
@@ -0,0 +1,334 @@
+"""
+Метрики в формате Prometheus, общие для всех воркеров.
+
+Каждый процесс пишет значения в свой файл METRICS_DIR/<pid>.db,
+отображённый в память: запись — это изменение восьми байт без
+блокировок между процессами. exposition() читает и суммирует файлы всех
+процессов, включая завершившиеся, поэтому счётчики не сбрасываются при
+перезапуске воркеров. Gauge тоже суммируется по процессам, а Gauge с
+live=True — только по живым: упавший посреди запроса воркер не должен
+навсегда оставлять запрос «в обработке».
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+from time import perf_counter
+
+from django.conf import settings
+
+from . import timing
+
+INITIAL_SIZE = 64 * 1024
+# Начало файла: сколько байт занято (4) и выравнивание до 8
+HEADER = 8
+
+REGISTRY = {}
+
+_lock = threading.Lock()
+_files = {}
+
+
+def _padding(length):
+    # Ключ с длиной занимают кратное 8 число байт, значение выровнено
+    return 8 - (length + 4) % 8
+
+
+def _entries(data, used):
+    """(ключ, значение, смещение значения) всех записей файла."""
+    pos = HEADER
+    while pos < used:
+        length = struct.unpack_from('i', data, pos)[0]
+        key = bytes(data[pos + 4:pos + 4 + length]).decode()
+        pos += 4 + length + _padding(length)
+        yield key, struct.unpack_from('d', data, pos)[0], pos
+        pos += 8
+
+
+class MmapValues:
+    """Значения одного процесса: ключ -> float в файле в памяти."""
+
+    def __init__(self, filename):
+        self._file = open(filename, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < INITIAL_SIZE:
+            self._file.truncate(INITIAL_SIZE)
+            size = INITIAL_SIZE
+        self._capacity = size
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._used = struct.unpack_from('i', self._map, 0)[0] or HEADER
+        self._positions = {
+            key: pos for key, _, pos in _entries(self._map, self._used)
+        }
+
+    def _position(self, key):
+        pos = self._positions.get(key)
+        if pos is not None:
+            return pos
+        encoded = key.encode()
+        entry = struct.pack(
+            f'i{len(encoded) + _padding(len(encoded))}sd',
+            len(encoded), encoded, 0.0,
+        )
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._map[self._used:self._used + len(entry)] = entry
+        self._used += len(entry)
+        # Читатели видят запись только после того, как она дописана
+        struct.pack_into('i', self._map, 0, self._used)
+        self._positions[key] = self._used - 8
+        return self._positions[key]
+
+    def add(self, key, amount):
+        pos = self._position(key)
+        value = struct.unpack_from('d', self._map, pos)[0]
+        struct.pack_into('d', self._map, pos, value + amount)
+
+    def set(self, key, value):
+        struct.pack_into('d', self._map, self._position(key), value)
+
+
+def _values():
+    """Файл текущего процесса; после fork у потомка будет свой."""
+    directory = settings.METRICS_DIR
+    key = (os.getpid(), directory)
+    values = _files.get(key)
+    if values is None:
+        os.makedirs(directory, exist_ok=True)
+        values = _files[key] = MmapValues(
+            os.path.join(directory, f'{os.getpid()}.db')
+        )
+    return values
+
+
+def _alive(filename):
+    """Жив ли процесс, которому принадлежит файл <pid>.db."""
+    try:
+        pid = int(os.path.splitext(os.path.basename(filename))[0])
+        os.kill(pid, 0)
+    except ValueError:
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю
+        return True
+    return True
+
+
+def _is_live(key):
+    metric = REGISTRY.get(json.loads(key)[0])
+    return getattr(metric, 'live', False)
+
+
+def read_all(directory=None):
+    """
+    Сумма значений по всем файлам процессов; live-метрики завершившихся
+    процессов пропускаются.
+    """
+    totals = {}
+    for filename in glob.glob(
+        os.path.join(directory or settings.METRICS_DIR, '*.db')
+    ):
+        with open(filename, 'rb') as file:
+            data = file.read()
+        if len(data) < HEADER:
+            continue
+        alive = _alive(filename)
+        used = struct.unpack_from('i', data, 0)[0]
+        for key, value, _ in _entries(data, used):
+            if alive or not _is_live(key):
+                totals[key] = totals.get(key, 0.0) + value
+    return totals
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        REGISTRY[name] = self
+
+    def _key(self, suffix, labels, *extra):
+        return json.dumps(
+            [self.name, suffix, sorted(labels.items()) + list(extra)],
+            ensure_ascii=False,
+        )
+
+    def _add(self, suffix, amount, labels, *extra):
+        with _lock:
+            _values().add(self._key(suffix, labels, *extra), amount)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self._add('', amount, labels)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, live=False):
+        super().__init__(name, documentation)
+        self.live = live
+
+    def inc(self, amount=1, **labels):
+        self._add('', amount, labels)
+
+    def dec(self, amount=1, **labels):
+        self._add('', -amount, labels)
+
+    def set(self, value, **labels):
+        with _lock:
+            _values().set(self._key('', labels), value)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets):
+        super().__init__(name, documentation)
+        self.buckets = [*sorted(buckets), float('inf')]
+
+    def observe(self, value, **labels):
+        # Корзины хранятся сразу накопленными, как их ждёт Prometheus
+        with _lock:
+            values = _values()
+            for bound in self.buckets:
+                if value <= bound:
+                    values.add(
+                        self._key('_bucket', labels, ['le', bound]), 1
+                    )
+            values.add(self._key('_sum', labels), value)
+            values.add(self._key('_count', labels), 1)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(_format_value(value) if name == 'le' else value)
+         .replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _sample_order(sample):
+    # Ряды по меткам, внутри — корзины по возрастанию, затем _sum и _count
+    suffix, labels, _ = sample
+    bound = [value for name, value in labels if name == 'le']
+    rest = [label for label in labels if label[0] != 'le']
+    return json.dumps(rest), suffix != '_bucket', suffix, bound
+
+
+def exposition():
+    """Все метрики всех процессов в текстовом формате Prometheus."""
+    samples = {}
+    for key, value in read_all().items():
+        name, suffix, labels = json.loads(key)
+        samples.setdefault(name, []).append((suffix, labels, value))
+    lines = []
+    for name, metric in REGISTRY.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for suffix, labels, value in sorted(
+            samples.get(name, []), key=_sample_order
+        ):
+            lines.append(
+                f'{name}{suffix}{_format_labels(labels)} '
+                f'{_format_value(value)}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+
+REQUESTS = Counter('yatube_requests_total', 'Запросы по вьюхам и статусам')
+IN_PROGRESS = Gauge(
+    'yatube_requests_in_progress', 'Запросы в обработке', live=True
+)
+LATENCY = Histogram(
+    'yatube_request_duration_seconds', 'Время ответа', LATENCY_BUCKETS
+)
+DB_QUERIES = Counter('yatube_db_queries_total', 'Запросы к БД')
+DB_SECONDS = Counter('yatube_db_seconds_total', 'Время запросов к БД')
+CACHE_HITS = Counter('yatube_cache_hits_total', 'Попадания в кеш')
+CACHE_MISSES = Counter('yatube_cache_misses_total', 'Промахи кеша')
+THUMBNAIL_SECONDS = Histogram(
+    'yatube_thumbnail_seconds',
+    'Время подготовки миниатюр за запрос или за картинку в фоне',
+    LATENCY_BUCKETS,
+)
+UPLOAD_BYTES = Histogram(
+    'yatube_upload_bytes', 'Размер загруженных файлов',
+    [2 ** power for power in range(14, 26, 2)],
+)
+
+
+def _view_name(request):
+    match = request.resolver_match
+    return match.view_name if match else 'unmatched'
+
+
+def observe_uploads(request, files):
+    """
+    Размеры загруженных файлов. Вызывает вьюха, которая сама разобрала
+    форму: middleware, читая request.FILES, разбирала бы multipart-тело и
+    там, где вьюхе оно не нужно.
+    """
+    view = _view_name(request)
+    for upload in files.values():
+        UPLOAD_BYTES.observe(upload.size, view=view)
+
+
+class MetricsMiddleware:
+    """
+    Пишет метрики запроса; разбивку по SQL, кешу и миниатюрам берёт из
+    core.timing, поэтому стоит сразу после ServerTimingMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        IN_PROGRESS.inc()
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            IN_PROGRESS.dec()
+        view = _view_name(request)
+        REQUESTS.inc(
+            view=view, method=request.method,
+            status=str(response.status_code),
+        )
+        LATENCY.observe(perf_counter() - started, view=view)
+        self.record_timings(view, timing.current())
+        return response
+
+    def record_timings(self, view, timings):
+        if timings is None:
+            return
+        DB_QUERIES.inc(timings.counts['db'], view=view)
+        DB_SECONDS.inc(timings.durations['db'], view=view)
+        CACHE_HITS.inc(timings.cache_hits, view=view)
+        CACHE_MISSES.inc(timings.cache_misses, view=view)
+        if timings.counts['thumb']:
+            THUMBNAIL_SECONDS.observe(timings.durations['thumb'], view=view)
@@ -0,0 +1,168 @@
+"""
+Чтение с реплик, запись в основную базу.
+
+PrimaryReplicaRouter отправляет запросы на чтение на одну из
+DATABASE_REPLICAS, отставание которой не больше REPLICA_MAX_LAG, а запись —
+в default. После записи ReplicaPinMiddleware ставит cookie, и следующие
+REPLICA_PIN_SECONDS запросы пользователя читают из основной базы, чтобы
+он сразу видел свой пост после редиректа.
+
+Отставание меряется по «пульсу»: sync_replica пишет время в таблицу
+replica_heartbeat основной базы, реплика получает строку вместе с
+остальными данными, и разница с текущим временем и есть отставание.
+"""
+import random
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+PRIMARY = 'default'
+PIN_COOKIE = 'primary_until'
+HEARTBEAT_TABLE = 'replica_heartbeat'
+
+_state = threading.local()
+_health = {'checked': None, 'replicas': []}
+
+
+def write_heartbeat(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {HEARTBEAT_TABLE} '
+            '(id INTEGER PRIMARY KEY, beat REAL NOT NULL)'
+        )
+        cursor.execute(
+            f'REPLACE INTO {HEARTBEAT_TABLE} (id, beat) VALUES (1, %s)',
+            [time.time()],
+        )
+
+
+def replica_lag(alias):
+    """Отставание реплики в секундах; None, если пульса на ней нет."""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f'SELECT beat FROM {HEARTBEAT_TABLE} WHERE id = 1')
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return None if row is None else max(time.time() - row[0], 0)
+
+
+def healthy_replicas():
+    """
+    Реплики с допустимым отставанием. Проверка повторяется не чаще раза в
+    REPLICA_CHECK_INTERVAL секунд, чтобы не стоить запроса каждому чтению.
+    """
+    now = time.monotonic()
+    checked = _health['checked']
+    if checked is None or now - checked > settings.REPLICA_CHECK_INTERVAL:
+        lags = {
+            alias: replica_lag(alias) for alias in settings.DATABASE_REPLICAS
+        }
+        _health['replicas'] = [
+            alias for alias, lag in lags.items()
+            if lag is not None and lag <= settings.REPLICA_MAX_LAG
+        ]
+        _health['checked'] = now
+    return _health['replicas']
+
+
+def copy_sqlite(source, target):
+    """Снимок SQLite-базы source в файл target через backup API."""
+    with closing(sqlite3.connect(source)) as src:
+        with closing(sqlite3.connect(target)) as dst:
+            src.backup(dst)
+
+
+def on_primary(func, *args, **kwargs):
+    """
+    Вызывает func в чужом потоке (см. core.db.serialized) на основной базе и
+    возвращает (результат, была ли запись), чтобы поток запроса поставил
+    cookie: флаг записи у каждого потока свой.
+    """
+    outer = (
+        getattr(_state, 'pinned', False), getattr(_state, 'wrote', False)
+    )
+    _state.pinned, _state.wrote = True, False
+    try:
+        result = func(*args, **kwargs)
+        return result, _state.wrote
+    finally:
+        _state.pinned, _state.wrote = outer[0], outer[1] or _state.wrote
+
+
+def note_write():
+    _state.wrote = True
+
+
+def pin():
+    """
+    Остаток запроса читает из основной базы: его рендер попадёт в общий
+    кеш под текущими версиями, а отстающая реплика положила бы туда старое.
+    """
+    _state.pinned = True
+
+
+def _pinned_stream(content):
+    # Потоковый ответ читается уже после выхода из middleware
+    _state.pinned = True
+    try:
+        yield from content
+    finally:
+        _state.pinned = False
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'pinned', False):
+            return PRIMARY
+        replicas = healthy_replicas()
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        note_write()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class ReplicaPinMiddleware:
+    """Держит пользователя на основной базе какое-то время после записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        _state.pinned = (
+            pinned_until > time.time()
+            or request.method not in ('GET', 'HEAD')
+        )
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            pinned = _state.pinned
+        finally:
+            _state.pinned = False
+        if response.streaming and pinned:
+            response.streaming_content = _pinned_stream(
+                response.streaming_content
+            )
+        if _state.wrote:
+            until = time.time() + settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, f'{until:.3f}',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+            )
+        return response
@@ -0,0 +1,50 @@
+"""
+Тестовый прогон на боевых настройках.
+
+Кеш страниц, SQLiteCache и остальные пути работают в тестах так же, как в
+продакшене; меняется только то, что нельзя делить с запущенным сайтом:
+файлы кеша и метрик уходят во временную папку, лог Server-Timing молчит,
+а реплика из YATUBE_SQLITE_REPLICA не получает чтений. manage.py test
+применяет это через TEST_RUNNER, pytest — фикстурой в tests/conftest.py.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def overrides(directory):
+    return {
+        'CACHES': {'default': {
+            **settings.CACHE_BACKENDS['sqlite'],
+            'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+        }},
+        'METRICS_DIR': os.path.join(directory, 'metrics'),
+        'SERVER_TIMING_LOG_SAMPLE': 0,
+        'DATABASE_REPLICAS': [],
+    }
+
+
+@contextmanager
+def test_environment():
+    directory = tempfile.mkdtemp(prefix='yatube-test-')
+    try:
+        with override_settings(**overrides(directory)):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._environment = ExitStack()
+        self._environment.enter_context(test_environment())
+
+    def teardown_test_environment(self, **kwargs):
+        self._environment.close()
+        super().teardown_test_environment(**kwargs)
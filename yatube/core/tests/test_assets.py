@@ -0,0 +1,100 @@
+import gzip
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.test import TestCase, override_settings
+
+from core import assets
+from core.views import IMMUTABLE
+
+
+class PurgeCssTests(TestCase):
+    def test_unused_rules_are_removed(self):
+        css = (
+            '@charset "UTF-8";/*! license */body{margin:0}'
+            '.btn,.unused{color:red}.unused:hover{color:blue}'
+            '.nav:not(.other){gap:0}'
+            '@media (min-width:768px){.unused{x:1}.btn{y:2}}'
+            '@media print{.unused{z:3}}'
+            '@keyframes spin{from{a:0}to{a:1}}'
+            '/*# sourceMappingURL=x.map */'
+        )
+        self.assertEqual(
+            assets.purge_css(css, {'btn', 'nav'}),
+            '@charset "UTF-8";/*! license */body{margin:0}.btn{color:red}'
+            '.nav:not(.other){gap:0}@media (min-width:768px){.btn{y:2}}'
+            '@keyframes spin{from{a:0}to{a:1}}',
+        )
+
+    def test_accept_encoding(self):
+        self.assertEqual(
+            assets.accepted_encodings('gzip;q=0.5, br;q=0, deflate'),
+            {'gzip', 'deflate'},
+        )
+
+    def test_malformed_quality_is_not_accepted(self):
+        for header in ('gzip;q=1.2.3', 'gzip;q=2', 'gzip;q=', 'gzip;q=nan'):
+            with self.subTest(header=header):
+                self.assertEqual(assets.accepted_encodings(header), set())
+        self.assertEqual(
+            assets.accepted_encodings('gzip; Q=1.000, br;q=0.001'),
+            {'gzip', 'br'},
+        )
+
+
+class BuildStaticTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(STATIC_ROOT=cls.root)
+        cls.settings_override.enable()
+        cls.manifest = assets.build()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.root, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_manifest_and_static_tag(self):
+        hashed = self.manifest['css/bootstrap.min.css']
+        self.assertTrue(assets.is_hashed(hashed))
+        self.assertEqual(
+            staticfiles_storage.url('css/bootstrap.min.css'),
+            f'/static/{hashed}',
+        )
+        response = self.client.get('/')
+        self.assertContains(response, hashed)
+
+    def test_bootstrap_is_purged(self):
+        with open(f'{self.root}/css/bootstrap.min.css') as f:
+            css = f.read()
+        self.assertIn('.navbar-brand', css)
+        self.assertNotIn('.carousel', css)
+        self.assertNotIn('sourceMappingURL', css)
+
+    def test_precompressed_by_accept_encoding(self):
+        url = '/static/' + self.manifest['css/bootstrap.min.css']
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        content = gzip.decompress(b''.join(response.streaming_content))
+
+        plain = self.client.get(url)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(b''.join(plain.streaming_content), content)
+
+    def test_unhashed_names_revalidate(self):
+        response = self.client.get('/static/css/bootstrap.min.css')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        repeated = self.client.get(
+            '/static/css/bootstrap.min.css',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(repeated.status_code, 304)
+        self.assertEqual(self.client.get('/static/../manage.py').status_code,
+                         404)
@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+def _incr_many(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.location = os.path.join(self.tmp_dir, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_basic_operations(self):
+        """set/get/add/delete/get_many ведут себя как у встроенных кешей."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        self.assertEqual(
+            self.cache.get_many(['key', 'new', 'missing']),
+            {'key': {'value': 1}, 'new': 'value'},
+        )
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.cache.clear()
+        self.assertFalse(self.cache.has_key('new'))
+
+    def test_shared_between_instances(self):
+        """Запись одного процесса сразу видна другому."""
+        SQLiteCache(self.location, {}).set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_expired_entries_are_missing(self):
+        self.cache.set('key', 'value', 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'fresh'))
+        with self.assertRaises(ValueError):
+            self.cache.set('gone', 1, 0.01)
+            time.sleep(0.02)
+            self.cache.incr('gone')
+
+    def test_least_recently_used_are_culled(self):
+        cache = SQLiteCache(self.location, {'OPTIONS': {
+            'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2, 'TOUCH_INTERVAL': 0,
+        }})
+        for i in range(4):
+            cache.set(f'key{i}', i)
+        cache.get('key0')
+        cache.get('key1')
+        cache.set('key4', 4)
+        self.assertEqual(
+            sorted(cache.get_many([f'key{i}' for i in range(5)])),
+            ['key0', 'key1', 'key4'],
+        )
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_incr_many, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
@@ -0,0 +1,78 @@
+import threading
+
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+
+from core.db import WriteQueue, serialized
+
+
+class SQLitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connection_is_configured(self):
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+        # 1 — NORMAL
+        self.assertEqual(self.pragma('synchronous'), 1)
+
+
+class WriteQueueTests(TestCase):
+    def setUp(self):
+        self.queue = WriteQueue(retries=2, backoff=0)
+
+    def test_runs_on_one_dedicated_thread(self):
+        seen = []
+
+        def job():
+            seen.append(threading.get_ident())
+
+        callers = [
+            threading.Thread(target=self.queue.submit, args=[job])
+            for _ in range(4)
+        ]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join()
+        self.assertEqual(len(seen), 4)
+        self.assertEqual(len(set(seen)), 1)
+        self.assertNotEqual(seen[0], threading.get_ident())
+
+    def test_locked_database_is_retried(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        self.assertEqual(self.queue.submit(flaky), 'ok')
+        self.assertEqual(len(attempts), 3)
+
+    def test_errors_reach_the_caller(self):
+        def locked():
+            raise OperationalError('database is locked')
+
+        def broken():
+            raise ValueError('boom')
+
+        with self.assertRaises(OperationalError):
+            self.queue.submit(locked)
+        with self.assertRaises(ValueError):
+            self.queue.submit(broken)
+
+    def test_serialized_write(self):
+        @serialized
+        def write():
+            return threading.current_thread().name
+
+        with override_settings(SQLITE_WRITE_QUEUE=True):
+            queued = write()
+        with override_settings(SQLITE_WRITE_QUEUE=False):
+            direct = write()
+        self.assertEqual(queued, 'sqlite-writer')
+        self.assertEqual(direct, threading.current_thread().name)
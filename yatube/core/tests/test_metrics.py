@@ -0,0 +1,137 @@
+import multiprocessing
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post
+
+User = get_user_model()
+
+COUNTER = metrics.Counter('test_events_total', 'Тестовый счётчик')
+HISTOGRAM = metrics.Histogram('test_sizes', 'Тестовая гистограмма', [1, 10])
+BUSY = metrics.Gauge('test_busy', 'Тестовый gauge живых процессов', live=True)
+
+
+def _count_events(times):
+    for _ in range(times):
+        COUNTER.inc(kind='child')
+
+
+def _die_busy():
+    BUSY.inc()
+    COUNTER.inc(kind='dead')
+
+
+class TempMetricsDir:
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        settings = override_settings(METRICS_DIR=self.tmp_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class RegistryTests(TempMetricsDir, SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        for value in (0.5, 5, 50):
+            HISTOGRAM.observe(value, view='v')
+        text = metrics.exposition()
+        self.assertIn('# TYPE test_sizes histogram', text)
+        self.assertIn('test_sizes_bucket{view="v",le="1"} 1\n', text)
+        self.assertIn('test_sizes_bucket{view="v",le="10"} 2\n', text)
+        self.assertIn('test_sizes_bucket{view="v",le="+Inf"} 3\n', text)
+        self.assertIn('test_sizes_sum{view="v"} 55.5\n', text)
+        self.assertIn('test_sizes_count{view="v"} 3\n', text)
+
+    def test_file_grows_and_survives_reopen(self):
+        for number in range(3000):
+            COUNTER.inc(kind=f'kind-{number}')
+        values = metrics.read_all()
+        self.assertEqual(len(values), 3000)
+        self.assertEqual(sum(values.values()), 3000)
+
+    def test_processes_are_summed(self):
+        COUNTER.inc(kind='child')
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_count_events, args=(10,))
+            for _ in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertIn(
+            'test_events_total{kind="child"} 31\n', metrics.exposition()
+        )
+
+    def test_live_gauge_skips_dead_processes(self):
+        BUSY.inc()
+        worker = multiprocessing.get_context('fork').Process(target=_die_busy)
+        worker.start()
+        worker.join()
+        text = metrics.exposition()
+        self.assertIn('test_busy 1\n', text)
+        self.assertIn('test_events_total{kind="dead"} 1\n', text)
+
+    def test_label_values_are_escaped(self):
+        COUNTER.inc(kind='a"b\\c')
+        self.assertIn(
+            'test_events_total{kind="a\\"b\\\\c"} 1', metrics.exposition()
+        )
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsEndpointTests(TempMetricsDir, TestCase):
+    def test_endpoint_is_protected(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        wrong = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer no')
+        self.assertEqual(wrong.status_code, 403)
+        admin = User.objects.create_superuser('root', 'root@y.tu', 'pass')
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_requests_are_recorded_per_view(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        text = response.content.decode()
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(
+            'yatube_requests_total{method="GET",status="200",'
+            'view="posts:index"} 2\n',
+            text,
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2\n',
+            text,
+        )
+        self.assertIn('yatube_db_queries_total{view="posts:index"}', text)
+        self.assertIn('yatube_cache_misses_total{view="posts:index"}', text)
+
+    def test_uploads_are_recorded_by_the_form_view(self):
+        user = User.objects.create_user(username='uploader')
+        post = Post.objects.create(author=user, text='Пост')
+        self.client.force_login(user)
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Не картинка',
+            'image': SimpleUploadedFile('notes.txt', b'abc'),
+        })
+        self.client.post(reverse('posts:add_comment', args=[post.pk]), {
+            'text': 'С файлом',
+            'image': SimpleUploadedFile('notes.txt', b'abc'),
+        })
+        text = metrics.exposition()
+        self.assertIn(
+            'yatube_upload_bytes_count{view="posts:post_create"} 1\n', text
+        )
+        self.assertNotIn(
+            'yatube_upload_bytes_count{view="posts:add_comment"}', text
+        )
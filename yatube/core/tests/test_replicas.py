@@ -0,0 +1,124 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core import replicas
+from core.db import serialized
+
+router = replicas.PrimaryReplicaRouter()
+
+
+def _view(request):
+    """Запоминает, откуда читала бы вьюха, и пишет по ?write=1."""
+    if request.GET.get('write'):
+        router.db_for_write(None)
+    return HttpResponse(router.db_for_read(None))
+
+
+def _streaming_view(request):
+    return StreamingHttpResponse(
+        router.db_for_read(None) for _ in range(2)
+    )
+
+
+@serialized
+def _queued_write():
+    router.db_for_write(None)
+    return router.db_for_read(None)
+
+
+def _queued_view(request):
+    return HttpResponse(_queued_write())
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_MAX_LAG=30)
+class RouterTests(TestCase):
+    def setUp(self):
+        health = mock.patch.dict(
+            replicas._health, {'checked': None, 'replicas': []}
+        )
+        health.start()
+        self.addCleanup(health.stop)
+        self.middleware = replicas.ReplicaPinMiddleware(_view)
+        self.factory = RequestFactory()
+
+    def read_from(self, request, lag=1.0):
+        with mock.patch.object(replicas, 'replica_lag', return_value=lag):
+            return self.middleware(request)
+
+    def test_reads_go_to_fresh_replica(self):
+        response = self.read_from(self.factory.get('/'))
+        self.assertEqual(response.content, b'replica')
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+        self.assertEqual(router.db_for_write(None), replicas.PRIMARY)
+
+    def test_lagging_or_silent_replica_is_skipped(self):
+        for lag in (100.0, None):
+            replicas._health['checked'] = None
+            with self.subTest(lag=lag):
+                response = self.read_from(self.factory.get('/'), lag)
+                self.assertEqual(response.content, b'default')
+
+    def test_user_is_pinned_after_write(self):
+        response = self.read_from(self.factory.get('/', {'write': 1}))
+        cookie = response.cookies[replicas.PIN_COOKIE]
+        request = self.factory.get('/')
+        request.COOKIES[replicas.PIN_COOKIE] = cookie.value
+        self.assertEqual(self.read_from(request).content, b'default')
+        request.COOKIES[replicas.PIN_COOKIE] = str(time.time() - 1)
+        self.assertEqual(self.read_from(request).content, b'replica')
+
+    @override_settings(SQLITE_WRITE_QUEUE=True)
+    def test_write_in_queue_pins_user(self):
+        self.middleware = replicas.ReplicaPinMiddleware(_queued_view)
+        response = self.read_from(self.factory.get('/'))
+        # Поток записи читает из основной базы, а cookie получает запрос
+        self.assertEqual(response.content, b'default')
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_unsafe_methods_read_primary(self):
+        response = self.read_from(self.factory.post('/'))
+        self.assertEqual(response.content, b'default')
+
+    def test_pinned_stream_reads_primary(self):
+        self.middleware = replicas.ReplicaPinMiddleware(_streaming_view)
+        request = self.factory.get('/')
+        request.COOKIES[replicas.PIN_COOKIE] = str(time.time() + 10)
+        for request, source in ((request, b'default'),
+                                (self.factory.get('/'), b'replica')):
+            response = self.read_from(request)
+            with mock.patch.object(replicas, 'replica_lag', return_value=1):
+                content = b''.join(response.streaming_content)
+            self.assertEqual(content, source * 2)
+            self.assertFalse(replicas._state.pinned)
+
+    def test_only_primary_is_migrated(self):
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+
+
+class ReplicaLagTests(TestCase):
+    def test_heartbeat_measures_lag(self):
+        self.assertIsNone(replicas.replica_lag('default'))
+        replicas.write_heartbeat(connection)
+        self.assertLess(replicas.replica_lag('default'), 5)
+
+    def test_sqlite_copy(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        source = os.path.join(tmp_dir, 'primary.sqlite3')
+        target = os.path.join(tmp_dir, 'replica.sqlite3')
+        with sqlite3.connect(source) as db:
+            db.execute('CREATE TABLE items (name TEXT)')
+            db.execute("INSERT INTO items VALUES ('post')")
+        replicas.copy_sqlite(source, target)
+        with sqlite3.connect(target) as db:
+            rows = db.execute('SELECT name FROM items').fetchall()
+        self.assertEqual(rows, [('post',)])
@@ -0,0 +1,79 @@
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import path, reverse
+
+from core import timing
+from posts.models import Post
+
+User = get_user_model()
+
+
+def metrics(response):
+    """{метрика: (dur, desc)} из заголовка Server-Timing."""
+    result = {}
+    for part in response['Server-Timing'].split(', '):
+        name, *params = part.split(';')
+        values = dict(param.split('=', 1) for param in params)
+        result[name] = (float(values['dur']), values.get('desc', ''))
+    return result
+
+
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='timed')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def test_header_breaks_down_request(self):
+        response = self.client.get(reverse('posts:index'))
+        found = metrics(response)
+        self.assertIn('total', found)
+        self.assertTrue(re.search(r'SQL x\d+', found['db'][1]))
+        self.assertIn('tpl', found)
+        self.assertIn('misses=', found['cache'][1])
+        for name in ('db', 'tpl', 'cache'):
+            self.assertLessEqual(found[name][0], found['total'][0])
+
+    def test_sql_count_matches_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('posts:post_detail', args=[self.post.pk])
+            )
+        self.assertEqual(metrics(response)['db'][1], '"SQL x2"')
+
+    def test_cache_hits_and_misses(self):
+        cache.set('timing:present', 1)
+        with override_settings(ROOT_URLCONF='core.tests.test_timing'):
+            response = self.client.get('/cache/')
+        self.assertEqual(
+            metrics(response)['cache'][1], '"Cache hits=2 misses=2"'
+        )
+
+    def test_outside_request_nothing_is_recorded(self):
+        self.assertIsNone(timing.current())
+        self.assertIsNone(cache.get('timing:absent'))
+
+    @override_settings(SERVER_TIMING_LOG_SAMPLE=1)
+    def test_sampled_log_names_view(self):
+        cache.clear()
+        with self.assertLogs('yatube.timing', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_count'], 0)
+
+
+def _cache_view(request):
+    cache.get('timing:present')
+    cache.get('timing:absent', 'default')
+    cache.get_many(['timing:present', 'timing:other'])
+    return HttpResponse()
+
+
+urlpatterns = [path('cache/', _cache_view)]
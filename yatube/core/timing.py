@@ -0,0 +1,219 @@
+"""
+Разбивка времени запроса для заголовка Server-Timing.
+
+ServerTimingMiddleware заводит на время запроса счётчики в thread-local,
+а хуки, которые install() ставит один раз при старте, добавляют в них
+время SQL (execute_wrapper), отрисовки шаблонов, обращений к кешу и
+миниатюр. Вне запроса хуки сразу передают вызов дальше, поэтому их можно
+не выключать в продакшене.
+"""
+import json
+import logging
+import random
+import threading
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger('yatube.timing')
+
+# Метрика -> описание в заголовке; порядок задаёт порядок в заголовке
+# (заголовки передаются в latin-1, поэтому по-английски)
+METRICS = {
+    'db': 'SQL',
+    'tpl': 'Templates',
+    'cache': 'Cache',
+    'thumb': 'Thumbnails',
+}
+
+_local = threading.local()
+_MISSING = object()
+
+
+class Timings:
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.rendering = False
+
+    def add(self, name, started):
+        self.durations[name] += perf_counter() - started
+        self.counts[name] += 1
+
+
+def current():
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def measure(name):
+    timings = current()
+    if timings is None:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, started)
+
+
+def timed(name):
+    """Декоратор: время вызовов функции попадает в метрику name."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _sql(execute, sql, params, many, context):
+    timings = current()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', started)
+
+
+def _template_render(render):
+    # Вложенные include считаются в составе внешнего шаблона
+    @wraps(render)
+    def wrapper(self, context):
+        timings = current()
+        if timings is None or timings.rendering:
+            return render(self, context)
+        timings.rendering = True
+        started = perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timings.add('tpl', started)
+            timings.rendering = False
+    return wrapper
+
+
+def _cache_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        timings = current()
+        if timings is None:
+            return get(self, key, default, version)
+        started = perf_counter()
+        value = get(self, key, _MISSING, version)
+        timings.add('cache', started)
+        if value is _MISSING:
+            timings.cache_misses += 1
+            return default
+        timings.cache_hits += 1
+        return value
+    return wrapper
+
+
+def _cache_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, version=None):
+        timings = current()
+        if timings is None:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        started = perf_counter()
+        # Базовый get_many вызывает get, эти вызовы не считаем дважды
+        _local.timings = None
+        try:
+            found = get_many(self, keys, version)
+        finally:
+            _local.timings = timings
+        timings.add('cache', started)
+        timings.cache_hits += len(found)
+        timings.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def _patch(cls, name, hook):
+    method = getattr(cls, name)
+    if not getattr(method, '_timed', False):
+        patched = hook(method)
+        patched._timed = True
+        setattr(cls, name, patched)
+
+
+def install():
+    """Ставит хуки на шаблоны, кеш по умолчанию и sorl-thumbnail."""
+    from sorl.thumbnail.base import ThumbnailBackend
+    _patch(Template, 'render', _template_render)
+    cache_class = type(caches['default'])
+    _patch(cache_class, 'get', _cache_get)
+    _patch(cache_class, 'get_many', _cache_get_many)
+    _patch(ThumbnailBackend, 'get_thumbnail', timed('thumb'))
+
+
+def header(timings, total):
+    parts = []
+    for name, description in METRICS.items():
+        if not timings.counts[name]:
+            continue
+        if name == 'cache':
+            description += (
+                f' hits={timings.cache_hits} misses={timings.cache_misses}'
+            )
+        else:
+            description += f' x{timings.counts[name]}'
+        parts.append(
+            f'{name};dur={timings.durations[name] * 1000:.2f};'
+            f'desc="{description}"'
+        )
+    parts.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(parts)
+
+
+def log_line(request, response, timings, total):
+    """Одна строка JSON на запрос для выборочного лога."""
+    match = request.resolver_match
+    record = {
+        'view': match.view_name if match else None,
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'total_ms': round(total * 1000, 2),
+        'cache_hits': timings.cache_hits,
+        'cache_misses': timings.cache_misses,
+    }
+    for name in METRICS:
+        record[f'{name}_ms'] = round(timings.durations[name] * 1000, 2)
+        record[f'{name}_count'] = timings.counts[name]
+    return json.dumps(record, ensure_ascii=False)
+
+
+class ServerTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = _local.timings = Timings()
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_sql))
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+        total = perf_counter() - started
+        response['Server-Timing'] = header(timings, total)
+        if random.random() < settings.SERVER_TIMING_LOG_SAMPLE:
+            logger.info(log_line(request, response, timings, total))
+        return response
@@ -1,6 +1,25 @@
-from django.shortcuts import render
+import hmac
+import mimetypes
+import os
 from http import HTTPStatus
 
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseForbidden,
+    HttpResponseNotModified,
+)
+from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import metrics as registry
+from .assets import is_hashed, pick_encoding
+
+# Файл с хешем в имени никогда не меняется
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
 
 def page_not_found(request, exception):
     return render(
@@ -24,3 +43,58 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def asset(request, path):
+    """
+    Статика из STATIC_ROOT: сжатая копия по Accept-Encoding, файлы с хешем
+    в имени кешируются на год, остальные — с проверкой по дате.
+    """
+    try:
+        filename = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(filename):
+        raise Http404
+    stat = os.stat(filename)
+    immutable = is_hashed(path)
+    if not immutable and not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'),
+        stat.st_mtime, stat.st_size,
+    ):
+        return HttpResponseNotModified()
+    served, encoding = pick_encoding(
+        filename, request.META.get('HTTP_ACCEPT_ENCODING', '')
+    )
+    content_type, _ = mimetypes.guess_type(filename)
+    response = FileResponse(
+        open(served, 'rb'),
+        content_type=content_type or 'application/octet-stream',
+        filename=os.path.basename(filename),
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = IMMUTABLE if immutable else 'no-cache'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
+
+
+def _metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and hmac.compare_digest(
+        header.encode(), f'Bearer {token}'.encode()
+    ):
+        return True
+    return request.user.is_superuser
+
+
+def metrics(request):
+    """Метрики всех воркеров для Prometheus."""
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,190 @@
+"""
+Нагрузочный прогон всех адресов posts, users и api через тестовый клиент.
+
+seed() заполняет базу синтетическими данными через mixer, run() много раз
+запрашивает каждый адрес и собирает перцентили времени ответа, число
+запросов к БД, пик памяти и размер страницы, compare() сравнивает отчёт
+с базовым.
+"""
+import math
+import random
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from mixer.backend.django import mixer
+
+from api import urls as api_urls
+from posts import urls as posts_urls
+from users import urls as users_urls
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+PERCENTILES = (50, 95, 99)
+URL_MODULES = (posts_urls, users_urls, api_urls)
+# Обязательные параметры запроса для отдельных маршрутов
+QUERY_STRINGS = {'posts:live': 'scope=index'}
+
+
+def seed(users=50, groups=5, posts=500, comments=1000, follows=300, seed=0):
+    """Синтетический набор данных; связи выбираются детерминированно."""
+    rng = random.Random(seed)
+    user_list = mixer.cycle(users).blend(
+        User, username=mixer.sequence('bench_user_{0}')
+    )
+    group_list = mixer.cycle(groups).blend(
+        Group, slug=mixer.sequence('bench-group-{0}')
+    )
+    mixer.cycle(posts).blend(
+        Post,
+        author=(rng.choice(user_list) for _ in range(posts)),
+        group=(rng.choice(group_list + [None]) for _ in range(posts)),
+    )
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    mixer.cycle(comments).blend(
+        Comment,
+        post_id=(rng.choice(post_ids) for _ in range(comments)),
+        author=(rng.choice(user_list) for _ in range(comments)),
+    )
+    pairs = set()
+    follows = min(follows, users * (users - 1))
+    while len(pairs) < follows:
+        user, author = rng.sample(user_list, 2)
+        pairs.add((user, author))
+    for user, author in pairs:
+        Follow.objects.create(user=user, author=author)
+    return user_list
+
+
+def _route_kwargs(user):
+    """Значения для параметров адресов: свой пост, чужой профиль, группа."""
+    post = Post.objects.filter(author=user).first()
+    if post is None:
+        post = Post.objects.create(author=user, text='Benchmark post')
+    author = User.objects.exclude(pk=user.pk).order_by(
+        '-stats__followers_count', 'pk'
+    ).first()
+    group = Group.objects.order_by('-posts_count', 'pk').first()
+    return {
+        'post_id': post.pk,
+        'username': author.username,
+        'slug': group.slug,
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    }
+
+
+def routes(user):
+    """Имена и адреса всех маршрутов из URL_MODULES."""
+    values = _route_kwargs(user)
+    result = {}
+    for module in URL_MODULES:
+        for pattern in module.urlpatterns:
+            name = f'{module.app_name}:{pattern.name}'
+            kwargs = {key: values[key] for key in pattern.pattern.converters}
+            result[name] = reverse(name, kwargs=kwargs)
+            if name in QUERY_STRINGS:
+                result[name] += '?' + QUERY_STRINGS[name]
+    return result
+
+
+def percentile(values, pct):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    index = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def _fetch(client, url, login_as):
+    """Ответ и тело целиком, включая потоковые ответы."""
+    # Выход из аккаунта — тоже маршрут, сессию восстанавливаем
+    if '_auth_user_id' not in client.session:
+        client.force_login(login_as)
+    response = client.get(url)
+    if response.streaming:
+        return response, b''.join(response.streaming_content)
+    return response, response.content
+
+
+def measure(client, url, requests, login_as):
+    """
+    Первый запрос считается холодным и в перцентили не входит; пик памяти
+    снимается отдельным запросом, чтобы tracemalloc не искажал время.
+    """
+    timings = []
+    queries = []
+    sizes = []
+    status = None
+    for _ in range(requests + 1):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response, body = _fetch(client, url, login_as)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+        sizes.append(len(body))
+        status = response.status_code
+    tracemalloc.start()
+    _fetch(client, url, login_as)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    cold, timings = timings[0], timings[1:]
+    stats = {
+        f'p{pct}_ms': round(percentile(timings, pct), 3)
+        for pct in PERCENTILES
+    }
+    stats.update({
+        'cold_ms': round(cold, 3),
+        'queries': max(queries[1:]),
+        'cold_queries': queries[0],
+        'bytes': percentile(sizes[1:], 50),
+        'peak_kb': round(peak / 1024, 1),
+        'status': status,
+    })
+    return {'url': url, **stats}
+
+
+def run(user, requests=20):
+    """Отчёт по всем маршрутам от имени пользователя user."""
+    client = Client()
+    return {
+        name: measure(client, url, requests, user)
+        for name, url in routes(user).items()
+    }
+
+
+def compare(report, baseline, tolerance=0.25, min_delta_ms=1.0):
+    """
+    Список регрессий относительно базового отчёта.
+
+    Время сравнивается по p95 с допуском tolerance (доля) и не меньше
+    min_delta_ms, чтобы шум на быстрых страницах не считался регрессией;
+    число запросов к БД должно совпадать или уменьшаться.
+    """
+    problems = []
+    for name, base in baseline['routes'].items():
+        current = report['routes'].get(name)
+        if current is None:
+            problems.append(f'{name}: маршрут пропал из отчёта')
+            continue
+        if current['queries'] > base['queries']:
+            problems.append(
+                f"{name}: запросов к БД {current['queries']} "
+                f"вместо {base['queries']}"
+            )
+        limit = max(
+            base['p95_ms'] * (1 + tolerance), base['p95_ms'] + min_delta_ms
+        )
+        if current['p95_ms'] > limit:
+            problems.append(
+                f"{name}: p95 {current['p95_ms']} мс "
+                f"при базовом {base['p95_ms']} мс"
+            )
+    return problems
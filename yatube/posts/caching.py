@@ -0,0 +1,195 @@
+"""
+Версионированные ключи для кеша фрагментов лент.
+
+Каждая область (главная, группа, автор, пост) хранит в кеше свою версию.
+Сигналы при записи меняют версию, и старые фрагменты больше не читаются,
+поэтому их можно держать в кеше долго.
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from core import replicas
+from yatube.settings import FEED_CACHE_TIMEOUT, LIVE_POLL_INTERVAL
+
+INDEX = 'index'
+# Ссылки на группы есть во всех лентах
+GROUPS = 'groups'
+# Порядок «Обсуждаемого» (см. trending)
+TRENDING = 'trending'
+# comments_count в списках постов API: меняется с каждым комментарием
+COMMENT_COUNTS = 'comment_counts'
+
+# Будит ожидающих wait_for_change() при записи в этом же процессе
+_changed = threading.Condition()
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def follow_scope(user_id):
+    """Подписки пользователя: кнопка в профилях и лента подписок."""
+    return f'follow:{user_id}'
+
+
+def _version_key(scope):
+    return f'feed_version:{scope}'
+
+
+def scope_versions(*scopes):
+    """Текущие версии областей; пропавшие из кеша заводятся заново."""
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*scopes):
+    """Новая версия области делает недоступными все её фрагменты."""
+    version = time.time_ns()
+    cache.set_many(
+        {_version_key(scope): version for scope in scopes if scope}, None
+    )
+    with _changed:
+        _changed.notify_all()
+
+
+def wait_for_change(scope, version, timeout):
+    """
+    Ждёт, пока версия области перестанет быть равной version, но не
+    дольше timeout секунд; возвращает текущую версию. Записи в этом
+    процессе будят сразу, в других — замечаются опросом кеша раз в
+    LIVE_POLL_INTERVAL.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        current = scope_versions(scope)[0]
+        remaining = deadline - time.monotonic()
+        if current != version or remaining <= 0:
+            return current
+        with _changed:
+            _changed.wait(min(remaining, LIVE_POLL_INTERVAL))
+
+
+def invalidate_post(post, old_group_id=None):
+    """Сбрасывает все ленты, где виден пост."""
+    invalidate(
+        INDEX,
+        author_scope(post.author_id),
+        post_scope(post.pk),
+        post.group_id and group_scope(post.group_id),
+        old_group_id and group_scope(old_group_id),
+    )
+
+
+def fragment_context(request, *scopes):
+    """Ключ и время жизни для {% cache %}: версии областей + страница."""
+    scopes = (GROUPS, *scopes)
+    versions = scope_versions(*scopes)
+    page = request.GET.get('cursor') or request.GET.get('page') or ''
+    key = ','.join(f'{s}={v}' for s, v in zip(scopes, versions))
+    return {
+        'cache_key': f'{key}:{page}',
+        'cache_timeout': FEED_CACHE_TIMEOUT,
+    }
+
+
+def remember_id(kind, key, value):
+    """Запоминает id объекта по значению из адреса (slug, username...)."""
+    cache.set(f'known_id:{kind}:{key}', value, FEED_CACHE_TIMEOUT)
+
+
+def known_id(kind, key):
+    return cache.get(f'known_id:{kind}:{key}')
+
+
+def page_versions(scopes):
+    """Версии областей страницы; None, пока области неизвестны."""
+    if scopes is None:
+        return None
+    return scope_versions(GROUPS, *scopes)
+
+
+def validators(request, versions):
+    """ETag и Last-Modified (для анонимов) по версиям областей страницы."""
+    if versions is None:
+        return None, None
+    # Шапка и формы зависят от пользователя и его CSRF-cookie
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    raw = f'{request.user.pk}:{csrf}:' + ','.join(map(str, versions))
+    etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+    # Дата не различает пользователей, поэтому только для анонимов
+    last_modified = None
+    if not request.user.is_authenticated:
+        last_modified = max(versions) // 10 ** 9
+    return etag, last_modified
+
+
+def set_validators(response, etag, last_modified):
+    if etag is not None:
+        response.setdefault('ETag', etag)
+    if last_modified is not None:
+        response.setdefault('Last-Modified', http_date(last_modified))
+    return response
+
+
+def conditional(scopes_func, shared=False):
+    """
+    Условный GET по версиям областей, как condition(), но без запросов к БД.
+
+    scopes_func(request, *args, **kwargs) возвращает области страницы по
+    id, которые вьюха сохранила через remember_id(), или None, пока id
+    неизвестен. Если версии не изменились, клиент получает 304 без
+    пагинатора и шаблонов; иначе валидаторы ставятся на ответ вьюхи.
+    shared=True разрешает кешировать страницу целиком (см. page_cache) по
+    тем же областям. Если среди них есть личные, нужные только валидатору,
+    shared — своя функция областей общей копии страницы. Такая вьюха
+    читает из основной базы: её рендер заполняет кеш страницы и фрагментов.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            etag, last_modified = validators(
+                request, page_versions(scopes_func(request, *args, **kwargs))
+            )
+            if etag is not None:
+                response = get_conditional_response(
+                    request, etag=etag, last_modified=last_modified
+                )
+                if response is not None:
+                    return response
+            if shared:
+                replicas.pin()
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            if etag is None:
+                etag, last_modified = validators(request, page_versions(
+                    scopes_func(request, *args, **kwargs)
+                ))
+            return set_validators(response, etag, last_modified)
+        wrapper.scopes = scopes_func
+        if shared:
+            wrapper.page_scopes = scopes_func if shared is True else shared
+        return wrapper
+    return decorator
@@ -0,0 +1,89 @@
+"""
+Конкурентная запись: потоки одновременно создают посты, пишут
+комментарии и подписываются, как post_create, add_comment и
+profile_follow. Каждый поток работает со своим соединением, как воркер
+сервера, поэтому замер показывает, сколько записей в секунду выдерживает
+база и сколько из них падает с database is locked.
+"""
+import random
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection, transaction
+
+from core.db import is_locked, write_queue
+from .benchmark import percentile
+from .models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+def _create_post(user, rng):
+    Post.objects.create(author=user, text=f'Пост {rng.random()}')
+
+
+def _add_comment(user, rng):
+    # Как add_comment: сначала get_object_or_404, потом запись
+    post = Post.objects.order_by('-pk').only('pk').first()
+    Comment.objects.create(author=user, post=post, text='Комментарий')
+
+
+def _toggle_follow(user, rng):
+    author = User.objects.exclude(pk=user.pk).order_by('?').first()
+    follow, created = Follow.objects.get_or_create(user=user, author=author)
+    if not created:
+        follow.delete()
+
+
+OPERATIONS = (_create_post, _add_comment, _toggle_follow)
+
+
+def _worker(users, operations, seed, use_queue, results):
+    rng = random.Random(seed)
+    timings = []
+    locked = 0
+    try:
+        for _ in range(operations):
+            operation = rng.choice(OPERATIONS)
+            user = rng.choice(users)
+            started = time.perf_counter()
+            try:
+                if use_queue:
+                    write_queue.submit(operation, user, rng)
+                else:
+                    with transaction.atomic():
+                        operation(user, rng)
+            except OperationalError as error:
+                if not is_locked(error):
+                    raise
+                locked += 1
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        connection.close()
+    results.append((timings, locked))
+
+
+def run(users, threads=8, operations=50, use_queue=False):
+    """Пропускная способность, p95 и число ошибок блокировки."""
+    results = []
+    workers = [
+        threading.Thread(
+            target=_worker,
+            args=(users, operations, number, use_queue, results),
+        )
+        for number in range(threads)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    timings = [timing for worker, _ in results for timing in worker]
+    locked = sum(count for _, count in results)
+    return {
+        'ops_per_s': round((len(timings) - locked) / elapsed, 1),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'locked': locked,
+    }
@@ -0,0 +1,73 @@
+"""Денормализованные счётчики постов, комментариев и подписок."""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+def _apply(queryset, deltas):
+    return queryset.update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def bump_author(user_id, **deltas):
+    """Атомарно сдвигает счётчики AuthorStats, заводя строку при росте."""
+    if not user_id:
+        return
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    if _apply(stats, deltas) or min(deltas.values()) < 0:
+        # Уменьшение без строки бывает при каскадном удалении автора
+        return
+    AuthorStats.objects.get_or_create(user_id=user_id)
+    _apply(stats, deltas)
+
+
+def bump_post(post_id, delta):
+    _apply(Post.objects.filter(pk=post_id), {'comments_count': delta})
+
+
+def bump_group(group_id, delta):
+    if group_id:
+        _apply(Group.objects.filter(pk=group_id), {'posts_count': delta})
+
+
+def followers_count(user_id):
+    """Свежее число подписчиков одним запросом (после bump_author)."""
+    return AuthorStats.objects.filter(user_id=user_id).values_list(
+        'followers_count', flat=True
+    ).first() or 0
+
+
+def stats_for(user):
+    """Счётчики пользователя; для новичка без строки — нули."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(user=user)
+
+
+def _count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def recount():
+    """Пересчитывает все счётчики пакетными UPDATE для починки дрейфа."""
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=pk)
+         for pk in User.objects.values_list('pk', flat=True).iterator()),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    AuthorStats.objects.update(
+        posts_count=_count(Post, 'author'),
+        comments_count=_count(Comment, 'author'),
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+    Post.objects.update(comments_count=_count(Comment, 'post'))
+    Group.objects.update(posts_count=_count(Post, 'group'))
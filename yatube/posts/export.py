@@ -0,0 +1,187 @@
+"""
+Потоковая выгрузка постов, комментариев и подписок.
+
+Строки читаются через values().iterator() порциями по EXPORT_CHUNK_SIZE и
+сразу превращаются в NDJSON или CSV, поэтому память не зависит от объёма
+выгрузки. Архив zip пишется в поток без перемотки (zipfile сам ставит
+дескрипторы данных после каждого файла), картинки постов копируются в него
+кусками из хранилища.
+"""
+import csv
+import io
+import json
+import posixpath
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Post
+from yatube.settings import EXPORT_CHUNK_SIZE
+
+FORMATS = ('ndjson', 'csv')
+# Набор -> (модель, {колонка: путь для values()}, поле владельца)
+DATASETS = {
+    'posts': (Post, {
+        'id': 'id',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'image': 'image',
+        'comments_count': 'comments_count',
+    }, 'author'),
+    'comments': (Comment, {
+        'id': 'id',
+        'pub_date': 'pub_date',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+    }, 'author'),
+    'follows': (Follow, {
+        'user': 'user__username',
+        'author': 'author__username',
+    }, 'user'),
+}
+# Сколько байт картинки читать за раз
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def rows(dataset, user=None):
+    """Словари {колонка: значение}; с user — только его записи."""
+    model, columns, owner = DATASETS[dataset]
+    queryset = model.objects.all()
+    if user is not None:
+        queryset = queryset.filter(**{owner: user})
+    values = queryset.order_by('pk').values_list(*columns.values())
+    for row in values.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield dict(zip(columns, row))
+
+
+def ndjson(dataset, user=None, tagged=False):
+    """
+    Строки NDJSON. tagged добавляет поле type с именем набора, чтобы
+    несколько наборов можно было склеить в один поток.
+    """
+    for row in rows(dataset, user):
+        if tagged:
+            row = {'type': dataset, **row}
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False)
+        yield '\n'
+
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def csv_lines(dataset, user=None):
+    columns = DATASETS[dataset][1]
+    yield _csv_line(columns)
+    for row in rows(dataset, user):
+        yield _csv_line(
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in row.values()
+        )
+
+
+def lines(fmt, datasets, user=None):
+    """Текст одного файла: NDJSON любых наборов или CSV одного набора."""
+    if fmt == 'csv':
+        if len(datasets) != 1:
+            raise ValueError('CSV без архива — только один набор')
+        return csv_lines(datasets[0], user)
+    return (
+        chunk for dataset in datasets
+        for chunk in ndjson(dataset, user, tagged=len(datasets) > 1)
+    )
+
+
+def _batched(chunks, size=FILE_CHUNK_SIZE):
+    """Склеивает мелкие строки в куски около size байт."""
+    batch = []
+    length = 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        batch.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(batch)
+            batch = []
+            length = 0
+    if batch:
+        yield b''.join(batch)
+
+
+def stream(fmt, datasets, user=None):
+    """Байты одного файла выгрузки кусками."""
+    return _batched(lines(fmt, datasets, user))
+
+
+class _Sink:
+    """Файл только для записи: zipfile пишет, генератор забирает байты."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def image_names(user=None):
+    posts = Post.objects.exclude(image='')
+    if user is not None:
+        posts = posts.filter(author=user)
+    return posts.order_by('pk').values_list('image', flat=True).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+
+
+def archive(fmt, datasets, user=None, images=False):
+    """Байты zip-архива: по файлу на набор и, если нужно, картинки."""
+    return (data for data in _archive(fmt, datasets, user, images) if data)
+
+
+def _archive(fmt, datasets, user, images):
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for dataset in datasets:
+            with zf.open(f'{dataset}.{fmt}', 'w', force_zip64=True) as f:
+                for chunk in stream(fmt, [dataset], user):
+                    f.write(chunk)
+                    yield sink.drain()
+        for name in image_names(user) if images else ():
+            if not default_storage.exists(name):
+                continue
+            # Картинки уже сжаты, повторно их не жмём
+            target = posixpath.join('images', name)
+            with zf.open(
+                zipfile.ZipInfo(target), 'w', force_zip64=True
+            ) as f, default_storage.open(name) as source:
+                for chunk in source.chunks(FILE_CHUNK_SIZE):
+                    f.write(chunk)
+                    yield sink.drain()
+    yield sink.drain()
+
+
+def filename(fmt, datasets, zipped):
+    name = datasets[0] if len(datasets) == 1 else 'yatube'
+    return f'{name}.zip' if zipped else f'{name}.{fmt}'
+
+
+def content_type(fmt, zipped):
+    if zipped:
+        return 'application/zip'
+    if fmt == 'csv':
+        return 'text/csv; charset=utf-8'
+    return 'application/x-ndjson; charset=utf-8'
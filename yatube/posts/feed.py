@@ -0,0 +1,189 @@
+"""Лента подписок: fan-out on write с pull-путём для популярных авторов."""
+from django.db import connection
+
+from .models import FeedEntry, Follow, Post
+from yatube.settings import FEED_DEPTH, FEED_FANOUT_LIMIT
+
+
+def follower_ids(author_id):
+    """
+    Id подписчиков автора или None, если их больше FEED_FANOUT_LIMIT
+    и автор читается pull-путём.
+    """
+    ids = list(
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)[:FEED_FANOUT_LIMIT + 1]
+    )
+    if len(ids) > FEED_FANOUT_LIMIT:
+        return None
+    return ids
+
+
+def _cutoff(user_id):
+    """(pub_date, post_id) первой записи за пределами FEED_DEPTH или None."""
+    beyond = FeedEntry.objects.filter(user_id=user_id).order_by(
+        '-pub_date', '-post_id'
+    ).values_list('pub_date', 'post_id')[FEED_DEPTH:FEED_DEPTH + 1]
+    return next(iter(beyond), None)
+
+
+def trim(user_ids):
+    """
+    Оставляет в ленте каждого пользователя FEED_DEPTH свежих записей.
+    Граница ищется по индексу (user, pub_date, post) один раз на
+    пользователя, а удаляется диапазон за ней, поэтому fan-out на тысячу
+    подписчиков стоит пары тысяч коротких запросов, а не подзапроса на
+    каждую строку.
+    """
+    sql = (
+        f'DELETE FROM {FeedEntry._meta.db_table} '
+        'WHERE user_id = %s AND (pub_date, post_id) <= (%s, %s)'
+    )
+    with connection.cursor() as cursor:
+        for user_id in user_ids:
+            cutoff = _cutoff(user_id)
+            if cutoff is None:
+                continue
+            pub_date, post_id = cutoff
+            cursor.execute(sql, [
+                user_id,
+                connection.ops.adapt_datetimefield_value(pub_date),
+                post_id,
+            ])
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    user_ids = follower_ids(post.author_id)
+    if not user_ids:
+        return
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in user_ids),
+        ignore_conflicts=True,
+    )
+    trim(user_ids)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту свежие посты автора сразу после подписки."""
+    if follower_ids(author_id) is None:
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:FEED_DEPTH]
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts),
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def purge(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def pulled_author_ids(user_id):
+    """Авторы из подписок, которые читаются pull-путём, без fan-out."""
+    return list(Follow.objects.filter(
+        user_id=user_id,
+        author__stats__followers_count__gt=FEED_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True))
+
+
+class Feed:
+    """
+    Лента подписок для CursorPaginator.
+
+    id постов страницы выбираются одним составным запросом: записи
+    FeedEntry читателя по индексу (user, pub_date, post) и по ветке на
+    каждого популярного автора по индексу (author, pub_date, id). Ветки
+    уже упорядочены, SQLite сливает их и останавливается на LIMIT, поэтому
+    страница стоит столько же, сколько её размер. Сами посты грузятся
+    вторым запросом по первичному ключу, как в search.SearchResults.
+    """
+
+    def __init__(self, user_id, bound=None, ascending=False, offset=0):
+        self.user_id = user_id
+        self.bound = bound
+        self.ascending = ascending
+        self.offset = offset
+
+    def _clone(self, **changes):
+        state = {
+            'bound': self.bound,
+            'ascending': self.ascending,
+            'offset': self.offset,
+            **changes,
+        }
+        return Feed(self.user_id, **state)
+
+    def order_by(self, *fields):
+        # Порядок ленты всегда (-pub_date, -id)
+        return self
+
+    def older(self, pub_date, pk):
+        return self._clone(bound=(pub_date, pk), ascending=False)
+
+    def newer(self, pub_date, pk):
+        return self._clone(bound=(pub_date, pk), ascending=True)
+
+    def _branches(self):
+        condition = ''
+        params = []
+        if self.bound is not None:
+            pub_date, pk = self.bound
+            sign = '>' if self.ascending else '<'
+            condition = f' AND (pub_date, {{id}}) {sign} (%s, %s)'
+            params = [
+                connection.ops.adapt_datetimefield_value(pub_date), pk
+            ]
+        branches = [(
+            f'SELECT post_id AS id, pub_date '
+            f'FROM {FeedEntry._meta.db_table} WHERE user_id = %s'
+            + condition.format(id='post_id'),
+            [self.user_id, *params],
+        )]
+        for author_id in pulled_author_ids(self.user_id):
+            branches.append((
+                f'SELECT id, pub_date FROM {Post._meta.db_table} '
+                f'WHERE author_id = %s' + condition.format(id='id'),
+                [author_id, *params],
+            ))
+        return branches
+
+    def ids(self, offset, limit):
+        """id постов страницы; UNION убирает пост, попавший в две ветки."""
+        branches = self._branches()
+        direction = 'ASC' if self.ascending else 'DESC'
+        sql = (
+            ' UNION '.join(branch for branch, _ in branches)
+            + f' ORDER BY pub_date {direction}, id {direction} '
+            'LIMIT %s OFFSET %s'
+        )
+        params = [param for _, values in branches for param in values]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*params, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = self.offset + (index.start or 0)
+        if index.stop is None:
+            return self._clone(offset=start)
+        ids = self.ids(start, index.stop - (index.start or 0))
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def feed_for(user):
+    """
+    Посты ленты подписок: материализованные записи плюс pull от авторов,
+    у которых слишком много подписчиков для fan-out.
+    """
+    return Feed(user.pk)
@@ -1,6 +1,8 @@
 from django import forms
+from django.template.defaultfilters import filesizeformat
 
 from .models import Post, Comment
+from yatube.settings import POST_IMAGE_MAX_BYTES, POST_IMAGE_MAX_PIXELS
 
 
 class PostForm(forms.ModelForm):
@@ -8,6 +10,38 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Обрезанный загрузчиком файл не дошёл бы до проверки размера:
+        # ImageField раньше сообщил бы, что это не картинка
+        self.oversized_image = None
+        image = self.files.get('image')
+        if image is not None and image.size > POST_IMAGE_MAX_BYTES:
+            self.files = self.files.copy()
+            del self.files['image']
+            self.oversized_image = image
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        # Размеры берутся из заголовка, пиксели не декодируются
+        pillow_image = getattr(image, 'image', None)
+        if pillow_image is not None:
+            width, height = pillow_image.size
+            if width * height > POST_IMAGE_MAX_PIXELS:
+                raise forms.ValidationError(
+                    f'Слишком большая картинка: {width}x{height} пикселей'
+                )
+        return image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.oversized_image is not None:
+            self.add_error('image', forms.ValidationError(
+                'Файл больше '
+                f'{filesizeformat(POST_IMAGE_MAX_BYTES)}'
+            ))
+        return cleaned_data
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
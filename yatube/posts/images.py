@@ -0,0 +1,154 @@
+"""
+Фоновая обработка картинок постов.
+
+После коммита пул потоков перекодирует загрузку в прогрессивный JPEG
+без EXIF и готовит миниатюры фиксированных размеров. Они сохраняются
+в Post.thumbnails, чтобы шаблоны не ходили в хранилище и key-value store
+sorl-thumbnail на каждую строку ленты.
+"""
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from core import metrics, timing
+from . import caching
+from .models import Post
+from yatube.settings import POST_IMAGE_MAX_SIDE, POST_THUMBNAILS
+
+logger = logging.getLogger(__name__)
+
+_worker = None
+
+
+def thumbnail_name(source, size):
+    root = os.path.splitext(os.path.basename(source))[0]
+    return f'thumbs/{root}_{size[0]}x{size[1]}.jpg'
+
+
+def _flatten(image):
+    """RGB без альфа-канала: прозрачное становится белым."""
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def optimize_image(source):
+    """
+    Перекодирует картинку в прогрессивный JPEG не больше
+    POST_IMAGE_MAX_SIDE по большей стороне. EXIF не переносится,
+    ориентация из него применяется к пикселям.
+    """
+    max_size = (POST_IMAGE_MAX_SIDE, POST_IMAGE_MAX_SIDE)
+    with default_storage.open(source) as file:
+        image = Image.open(file)
+        # JPEG-декодер сразу уменьшает картинку и не держит её целиком
+        image.draft('RGB', max_size)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(max_size, Image.LANCZOS)
+        image = _flatten(image)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+    root = os.path.splitext(source)[0]
+    return default_storage.save(f'{root}.jpg', ContentFile(buffer.getvalue()))
+
+
+@timing.timed('thumb')
+def make_thumbnails(source):
+    """Режет картинку по центру под каждый размер из POST_THUMBNAILS."""
+    with default_storage.open(source) as file:
+        image = Image.open(file)
+        image = image.convert('RGB')
+    sizes = {}
+    for name, size in POST_THUMBNAILS.items():
+        thumb = ImageOps.fit(image, size, Image.LANCZOS)
+        buffer = BytesIO()
+        thumb.save(buffer, 'JPEG', quality=85, progressive=True)
+        path = default_storage.save(
+            thumbnail_name(source, size), ContentFile(buffer.getvalue())
+        )
+        sizes[name] = {
+            'url': default_storage.url(path),
+            'width': size[0],
+            'height': size[1],
+        }
+    return sizes
+
+
+def process_image(post_id, optimize=True):
+    """Перекодирует картинку поста и готовит для неё миниатюры."""
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'author', 'group'
+    ).first()
+    if post is None or not post.image:
+        return
+    source = post.image.name
+    result = optimize_image(source) if optimize else source
+    started = perf_counter()
+    data = {'source': result, 'sizes': make_thumbnails(result)}
+    # Внутри запроса время миниатюр запишет MetricsMiddleware
+    if timing.current() is None:
+        metrics.THUMBNAIL_SECONDS.observe(
+            perf_counter() - started, view='post-images'
+        )
+    # Картинку могли заменить, пока воркер работал
+    updated = Post.objects.filter(pk=post_id, image=source).update(
+        image=result, thumbnails=json.dumps(data)
+    )
+    if updated:
+        caching.invalidate_post(post)
+    if result != source:
+        default_storage.delete(source if updated else result)
+
+
+def _run(task, *args):
+    try:
+        task(*args)
+    except Exception:
+        logger.exception('Не удалось обработать картинку поста %s', args)
+    finally:
+        # У потока воркера своё соединение с БД
+        connection.close()
+
+
+def submit(task, *args):
+    """
+    Отдаёт задачу пулу потоков после коммита транзакции.
+    При IMAGE_WORKERS = 0 задача выполняется сразу, в текущем потоке.
+    """
+    global _worker
+    if not settings.IMAGE_WORKERS:
+        transaction.on_commit(lambda: task(*args))
+        return
+    if _worker is None:
+        _worker = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            thread_name_prefix='post-images',
+        )
+    transaction.on_commit(lambda: _worker.submit(_run, task, *args))
+
+
+def _exists(name):
+    try:
+        return default_storage.exists(name)
+    except SuspiciousFileOperation:
+        return False
+
+
+def schedule_processing(post):
+    """Ставит новую картинку поста в очередь воркера."""
+    if not post.image or post.thumbs or not _exists(post.image.name):
+        return
+    submit(process_image, post.pk)
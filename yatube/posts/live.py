@@ -0,0 +1,83 @@
+"""
+Канал новых записей: long-poll и server-sent events поверх версий
+областей из caching.
+
+Клиент присылает область (index, group:<id>, author:<id>, post:<id>),
+последнюю известную ему версию и id последней увиденной записи. Пока
+версия не сдвинулась, ожидание стоит только чтения из кеша; к базе
+обращаемся лишь за id новых записей.
+"""
+import json
+import re
+import time
+
+from . import caching
+from .models import Comment, Post
+
+# До 18 цифр: id должен помещаться в целое SQLite
+SCOPE = re.compile(r'^(index|(group|author|post):\d{1,18})$')
+# Больше id за раз не отдаём: клиенту всё равно перечитывать ленту
+MAX_IDS = 100
+
+
+def parse_scope(value):
+    """Область из запроса или None, если она не поддерживается."""
+    return value if value and SCOPE.match(value) else None
+
+
+def _queryset(scope):
+    """Посты области, а для post:<id> — комментарии к посту."""
+    kind, _, pk = scope.partition(':')
+    if kind == 'post':
+        return Comment.objects.filter(post_id=pk)
+    if kind == 'group':
+        return Post.objects.filter(group_id=pk)
+    if kind == 'author':
+        return Post.objects.filter(author_id=pk)
+    return Post.objects.all()
+
+
+def last_id(scope):
+    """id самой свежей записи области: с него клиент начинает ждать."""
+    ids = _queryset(scope).order_by('-pk').values_list('pk', flat=True)
+    return ids.first() or 0
+
+
+def new_ids(scope, after):
+    ids = _queryset(scope).filter(pk__gt=after).order_by('pk').values_list(
+        'pk', flat=True
+    )
+    return list(ids[:MAX_IDS])
+
+
+def poll(scope, version, after, timeout):
+    """
+    Один long-poll: {'version', 'ids', 'after'}; ids пуст, если версия
+    не сдвинулась за timeout. after — значение для следующего запроса.
+    """
+    current = caching.wait_for_change(scope, version, timeout)
+    ids = new_ids(scope, after) if current != version else []
+    return {'version': current, 'ids': ids, 'after': ids[-1] if ids else after}
+
+
+def events(scope, version, after, timeout):
+    """
+    Поток server-sent events: событие change на каждое изменение области
+    в пределах timeout, затем поток закрывается и браузер переподключается
+    с Last-Event-ID (это версия).
+    """
+    deadline = time.monotonic() + timeout
+    yield 'retry: 1000\n\n'
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        change = poll(scope, version, after, remaining)
+        if change['version'] == version:
+            return
+        version = change['version']
+        after = change['after']
+        yield (
+            f'id: {version}\nevent: change\n'
+            f'data: {json.dumps(change)}\n\n'
+        )
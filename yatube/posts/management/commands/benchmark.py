@@ -0,0 +1,101 @@
+import json
+import os
+import platform
+import shutil
+import tempfile
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment
+)
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p95/p99 времени ответа, число запросов к БД и размер '
+        'страниц для всех адресов posts и users на синтетических данных'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument('--comments', type=int, default=1000)
+        parser.add_argument('--follows', type=int, default=300)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--requests', type=int, default=20,
+            help='Сколько раз запрашивать каждый адрес',
+        )
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='Куда записать отчёт в формате JSON',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Базовый отчёт; при регрессии команда завершится с ошибкой',
+        )
+        parser.add_argument('--tolerance', type=float, default=0.25)
+        parser.add_argument('--min-delta-ms', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        dataset = {
+            key: options[key]
+            for key in ('users', 'groups', 'posts', 'comments', 'follows',
+                        'seed')
+        }
+        routes = self.measure(dataset, options['requests'])
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'requests': options['requests'],
+                'dataset': dataset,
+            },
+            'routes': routes,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        for name, stats in routes.items():
+            self.stdout.write(
+                f"{name:<30} p50 {stats['p50_ms']:>8.2f}  "
+                f"p95 {stats['p95_ms']:>8.2f}  p99 {stats['p99_ms']:>8.2f} мс"
+                f"  запросов {stats['queries']:>3}  "
+                f"{stats['bytes']:>7} байт  {stats['status']}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Отчёт записан в {options['output']}"
+        ))
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                problems = benchmark.compare(
+                    report, json.load(baseline),
+                    options['tolerance'], options['min_delta_ms'],
+                )
+            if problems:
+                raise CommandError('\n'.join(problems))
+
+    def measure(self, dataset, requests):
+        """Прогон на отдельной тестовой базе, кеше и каталоге медиа."""
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        tmp_dir = tempfile.mkdtemp()
+        caches = {'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': os.path.join(tmp_dir, 'cache.sqlite3'),
+        }}
+        try:
+            with override_settings(
+                CACHES=caches, MEDIA_ROOT=tmp_dir, IMAGE_WORKERS=0
+            ):
+                users = benchmark.seed(**dataset)
+                return benchmark.run(users[0], requests)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
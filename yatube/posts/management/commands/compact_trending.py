@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = 'Переносит очки «Обсуждаемого» в текущую эпоху и чистит остывшие'
+
+    def handle(self, *args, **options):
+        count = trending.compact()
+        self.stdout.write(self.style.SUCCESS(f'Удалено постов: {count}'))
@@ -0,0 +1,60 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии и подписки потоком в NDJSON или CSV, '
+        'при необходимости — zip-архивом с картинками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=export.FORMATS, default='ndjson'
+        )
+        parser.add_argument(
+            '--dataset', action='append', choices=list(export.DATASETS),
+            help='Набор данных; можно несколько, по умолчанию все',
+        )
+        parser.add_argument('--user', help='Только записи этого пользователя')
+        parser.add_argument('--zip', action='store_true')
+        parser.add_argument(
+            '--images', action='store_true',
+            help='Положить в архив картинки постов (включает --zip)',
+        )
+        parser.add_argument(
+            '--output', default='-', help='Файл; по умолчанию stdout'
+        )
+
+    def handle(self, *args, **options):
+        fmt = options['format']
+        datasets = options['dataset'] or list(export.DATASETS)
+        user = None
+        if options['user']:
+            user = get_user_model().objects.filter(
+                username=options['user']
+            ).first()
+            if user is None:
+                raise CommandError(f"Нет пользователя {options['user']}")
+        zipped = options['zip'] or options['images']
+        if fmt == 'csv' and len(datasets) > 1 and not zipped:
+            raise CommandError('Несколько наборов в CSV — только с --zip')
+        if zipped:
+            content = export.archive(fmt, datasets, user, options['images'])
+        else:
+            content = export.stream(fmt, datasets, user)
+        if options['output'] == '-':
+            self._write(sys.stdout.buffer, content)
+            return
+        with open(options['output'], 'wb') as f:
+            self._write(f, content)
+        self.stderr.write(f"Выгрузка записана в {options['output']}")
+
+    def _write(self, f, content):
+        for chunk in content:
+            f.write(chunk)
+        f.flush()
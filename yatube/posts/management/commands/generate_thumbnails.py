@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры для постов, у которых их ещё нет'
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(thumbnails='')
+        done = 0
+        for post_id in posts.values_list('pk', flat=True).iterator():
+            images.process_image(post_id, optimize=False)
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {done}'))
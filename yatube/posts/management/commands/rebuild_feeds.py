@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed
+from posts.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок из Follow'
+
+    def handle(self, *args, **options):
+        FeedEntry.objects.all().delete()
+        follows = Follow.objects.values_list('user_id', 'author_id')
+        for user_id, author_id in follows.iterator():
+            feed.backfill(user_id, author_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {FeedEntry.objects.count()}'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации авторов по совместным подпискам'
+
+    def handle(self, *args, **options):
+        count = recommendations.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Рекомендаций: {count}'))
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from posts import caching
+from posts.models import Group, Post
+from posts.utils import CursorPaginator
+from yatube.settings import ALLOWED_HOSTS, PAGE_POSTS_COUNT
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает кеш после деплоя: первые страницы главной, '
+        'страницы групп и профили самых популярных авторов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=5,
+            help='Сколько страниц главной прогреть',
+        )
+        parser.add_argument(
+            '--profiles', type=int, default=20,
+            help='Сколько профилей с наибольшим числом подписчиков прогреть',
+        )
+
+    def handle(self, *args, **options):
+        client = Client(SERVER_NAME=ALLOWED_HOSTS[0])
+        urls = self.index_urls(options['pages'])
+        # Без известного id страница не попала бы в кеш с первого запроса
+        for slug, pk in Group.objects.values_list('slug', 'pk'):
+            caching.remember_id('group', slug, pk)
+            urls.append(reverse('posts:group_page', args=[slug]))
+        authors = User.objects.filter(stats__isnull=False).order_by(
+            '-stats__followers_count', 'pk'
+        ).values_list('username', 'pk')[:options['profiles']]
+        for username, pk in authors:
+            caching.remember_id('author', username, pk)
+            urls.append(reverse('posts:profile', args=[username]))
+        failed = 0
+        for url in urls:
+            status = client.get(url).status_code
+            if status != 200:
+                failed += 1
+                self.stderr.write(f'{url}: {status}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогрето страниц: {len(urls) - failed}'
+        ))
+
+    def index_urls(self, pages):
+        """Адреса первых страниц главной с теми же курсорами, что в ленте."""
+        index = reverse('posts:index')
+        paginator = CursorPaginator(Post.objects.for_feed(), PAGE_POSTS_COUNT)
+        urls = []
+        cursor = None
+        while len(urls) < pages:
+            urls.append(f'{index}?cursor={cursor}' if cursor else index)
+            cursor = paginator.cursor_page(cursor).next_cursor
+            if cursor is None:
+                break
+        return urls
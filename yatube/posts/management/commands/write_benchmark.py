@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment
+)
+from mixer.backend.django import mixer
+
+from posts import concurrency
+from posts.models import Post
+
+# Как было до SQLITE_PRAGMAS: журнал отката и полный fsync
+BARE_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность конкурентной записи в SQLite '
+        'без настройки, с SQLITE_PRAGMAS и с очередью записи'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--operations', type=int, default=50,
+            help='Сколько записей делает каждый поток',
+        )
+        parser.add_argument('--users', type=int, default=20)
+
+    def handle(self, *args, **options):
+        profiles = (
+            ('bare', BARE_PRAGMAS, False),
+            ('pragmas', settings.SQLITE_PRAGMAS, False),
+            ('pragmas+queue', settings.SQLITE_PRAGMAS, True),
+        )
+        tmp_dir = tempfile.mkdtemp()
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        # Замер имеет смысл только на файле: у базы в памяти нет блокировок
+        connection.settings_dict['TEST']['NAME'] = os.path.join(
+            tmp_dir, 'db.sqlite3'
+        )
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(
+                CACHES={'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.'
+                               'LocMemCache',
+                }},
+                MEDIA_ROOT=tmp_dir,
+                IMAGE_WORKERS=0,
+            ):
+                users = mixer.cycle(options['users']).blend(
+                    'auth.User', username=mixer.sequence('writer_{0}')
+                )
+                mixer.cycle(options['users']).blend(Post, author=users[0])
+                for name, pragmas, use_queue in profiles:
+                    self.report(name, self.measure(
+                        users, pragmas, use_queue, options
+                    ))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def measure(self, users, pragmas, use_queue, options):
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            # Новые PRAGMA применяются к новым соединениям
+            connections.close_all()
+            return concurrency.run(
+                users, options['threads'], options['operations'], use_queue
+            )
+
+    def report(self, name, stats):
+        self.stdout.write(
+            f"{name:<15} {stats['ops_per_s']:>8.1f} записей/с  "
+            f"p95 {stats['p95_ms']:>8.2f} мс  "
+            f"database is locked: {stats['locked']}"
+        )
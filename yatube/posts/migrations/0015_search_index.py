@@ -0,0 +1,41 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+CREATE_SQL = (
+    'CREATE VIRTUAL TABLE posts_search USING fts5('
+    "text, comments, tokenize = 'unicode61 remove_diacritics 2')"
+)
+FILL_SQL = (
+    'INSERT INTO posts_search (rowid, text, comments) '
+    'SELECT id, text, ('
+    "SELECT coalesce(group_concat(text, ' '), '') FROM posts_comment "
+    'WHERE post_id = posts_post.id'
+    ') FROM posts_post'
+)
+
+
+def create_index(apps, schema_editor):
+    # Без FTS5 индекс не создаётся, и поиск работает через LIKE
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(CREATE_SQL)
+    except OperationalError:
+        return
+    schema_editor.execute(FILL_SQL)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,59 @@
+import heapq
+from itertools import groupby
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+
+def backfill_feeds(apps, schema_editor):
+    """
+    Ленты подписок для подписок, сделанных до FeedEntry: свежие
+    FEED_DEPTH постов всех авторов пользователя, кроме популярных, которые
+    читаются pull-путём. То же, что rebuild_feeds, но на исторических
+    моделях.
+    """
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    depth = settings.FEED_DEPTH
+    pulled = set(
+        Follow.objects.values('author_id').annotate(total=Count('pk'))
+        .filter(total__gt=settings.FEED_FANOUT_LIMIT)
+        .values_list('author_id', flat=True)
+    )
+    newest = {}
+
+    def posts_of(author_id):
+        if author_id not in newest:
+            newest[author_id] = list(
+                Post.objects.filter(author_id=author_id)
+                .order_by('-pub_date', '-pk')
+                .values_list('pub_date', 'pk')[:depth]
+            )
+        return newest[author_id]
+
+    follows = Follow.objects.exclude(author_id__in=pulled).order_by(
+        'user_id'
+    ).values_list('user_id', 'author_id')
+    for user_id, rows in groupby(follows.iterator(), key=lambda row: row[0]):
+        entries = heapq.nlargest(depth, (
+            entry for _, author_id in rows for entry in posts_of(author_id)
+        ))
+        FeedEntry.objects.bulk_create(
+            (FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+             for pub_date, pk in entries),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_feed_entry_order'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_feeds, migrations.RunPython.noop),
+    ]
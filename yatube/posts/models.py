@@ -1,3 +1,5 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -10,11 +12,43 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.IntegerField(default=0, editable=False)
 
     def __str__(self) -> str:
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    # Поля, которые шаблоны лент читают у поста, автора и группы
+    FEED_FIELDS = (
+        'text', 'pub_date', 'image', 'thumbnails', 'author', 'group',
+        'author__username', 'author__first_name', 'author__last_name',
+        'group__title', 'group__slug',
+    )
+
+    def for_feed(self):
+        """Посты для лент: автор и группа одним JOIN, без лишних полей."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+    def for_detail(self):
+        """Пост для отдельной страницы вместе с автором и группой."""
+        return self.select_related('author__stats', 'group')
+
+    def older(self, pub_date, pk):
+        """Записи после (pub_date, pk) в порядке ленты."""
+        return self.filter(
+            models.Q(pub_date__lt=pub_date)
+            | models.Q(pub_date=pub_date, pk__lt=pk)
+        )
+
+    def newer(self, pub_date, pk):
+        """Записи перед (pub_date, pk), ближайшие первыми."""
+        return self.filter(
+            models.Q(pub_date__gt=pub_date)
+            | models.Q(pub_date=pub_date, pk__gt=pk)
+        ).reverse()
+
+
 class Post(CreatedModel):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -39,14 +73,35 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.IntegerField(default=0, editable=False)
+    # JSON c готовыми миниатюрами, см. posts.images
+    thumbnails = models.TextField(blank=True, default='', editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         # выводим текст поста
         return self.text[:15]
 
+    @property
+    def thumbs(self):
+        """Миниатюры текущей картинки: {размер: {url, width, height}}."""
+        if not self.thumbnails or not self.image:
+            return {}
+        data = json.loads(self.thumbnails)
+        if data['source'] != self.image.name:
+            return {}
+        return data['sizes']
+
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         default_related_name = 'posts'
+        # Индексы под keyset-пагинацию лент по (pub_date, id)
+        indexes = [
+            models.Index(fields=['pub_date', 'id']),
+            models.Index(fields=['group', 'pub_date', 'id']),
+            models.Index(fields=['author', 'pub_date', 'id']),
+        ]
 
 
 class Comment(CreatedModel):
@@ -67,6 +122,11 @@ class Comment(CreatedModel):
         related_name='comments'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'pub_date', 'id']),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -87,3 +147,104 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+
+
+class FeedEntry(models.Model):
+    """Запись в ленте подписок пользователя (fan-out on write)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    # Копия Post.pub_date, чтобы обрезать ленту без JOIN
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            # post замыкает порядок (pub_date, id), как у ленты
+            models.Index(fields=['user', '-pub_date', '-post']),
+        ]
+
+
+class Recommendation(models.Model):
+    """
+    Автор, на которого стоит подписаться: score — сколько авторов из
+    подписок пользователя на него подписаны. Хранится top-K на каждого.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommended_to'
+    )
+    score = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_recommendation'
+            )
+        ]
+        # Порядок выдачи целиком из индекса, без сортировки
+        indexes = [
+            models.Index(fields=['user', '-score', 'author']),
+        ]
+
+
+class TrendingScore(models.Model):
+    """
+    Затухающий счёт активности поста (см. posts.trending). Очки хранятся
+    относительно начала эпохи era, поэтому в пределах эпохи порядок не
+    зависит от текущего времени и читается прямо из индекса.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending'
+    )
+    # Копия Post.group_id для выдачи по группе одним диапазоном индекса
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='+'
+    )
+    era = models.IntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-era', '-score']),
+            models.Index(fields=['group', '-era', '-score']),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Счётчики пользователя, которые поддерживают сигналы при записи."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+    followers_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
@@ -0,0 +1,185 @@
+"""
+Кеш целых страниц с «дырками» под персональные фрагменты.
+
+Страница кешируется одна на всех посетителей. Шапка, кнопка подписки,
+форма комментария и другие зависящие от пользователя куски отмечены тегом
+{% hole %}: в кеш попадает только метка, а при выдаче из кеша фрагмент
+рендерится заново для текущего запроса. Ключ страницы — адрес и версии её
+областей (caching.conditional(..., shared=True)), поэтому записи сбрасываются
+теми же сигналами, что и кеш фрагментов.
+"""
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+
+from . import caching
+from .forms import CommentForm
+from .recommendations import suggestions_for
+from .models import Follow
+
+HOLES = {}
+# Свежий рендер: метка, содержимое и закрывающая метка
+FILLED_HOLE = re.compile(r'<!--hole:(\w+):([^>]*)-->(.*?)<!--/hole-->', re.S)
+# Страница в кеше: только метка с параметрами
+EMPTY_HOLE = re.compile(r'<!--hole:(\w+):([^>]*)/-->')
+
+
+def hole(name):
+    """Регистрирует функцию (request, context, **params) -> HTML дырки."""
+    def register(func):
+        HOLES[name] = func
+        return func
+    return register
+
+
+def render_hole(name, request, context=None, **params):
+    """context есть только при рендере всей страницы, из кеша — None."""
+    return HOLES[name](request, context, **params)
+
+
+def mark(name, params, html):
+    return f'<!--hole:{name}:{urlencode(params)}-->{html}<!--/hole-->'
+
+
+def _fill(request, page):
+    return EMPTY_HOLE.sub(
+        lambda match: render_hole(
+            match[1], request, **dict(parse_qsl(match[2]))
+        ),
+        page,
+    )
+
+
+def _page_key(request, versions):
+    raw = f'{request.get_full_path()}:{versions}'
+    return 'page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+class PageCacheMiddleware:
+    """
+    Отдаёт страницы вьюх с shared=True из кеша, заполняя дырки.
+
+    Стоит последним: сессия и пользователь уже доступны для дырок, а
+    process_response остальных middleware (CSRF-cookie и т. п.) работает
+    и для ответов из кеша.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or b'<!--hole:' not in response.content:
+            return response
+        page = response.content.decode(response.charset)
+        key = getattr(request, '_page_cache_key', None)
+        if key and response.status_code == 200:
+            cache.set(
+                key,
+                FILLED_HOLE.sub(r'<!--hole:\1:\2/-->', page),
+                settings.PAGE_CACHE_TIMEOUT,
+            )
+        response.content = FILLED_HOLE.sub(r'\3', page)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        scopes_func = getattr(view_func, 'page_scopes', None)
+        if (
+            scopes_func is None
+            or not settings.PAGE_CACHE_TIMEOUT
+            or request.method not in ('GET', 'HEAD')
+        ):
+            return None
+        versions = caching.page_versions(
+            scopes_func(request, *view_args, **view_kwargs)
+        )
+        if versions is None:
+            return None
+        key = _page_key(request, versions)
+        page = cache.get(key)
+        if page is None:
+            request._page_cache_key = key
+            return None
+        if view_func.scopes is not scopes_func:
+            # В валидаторе есть и личные области, которых нет в ключе
+            versions = caching.page_versions(
+                view_func.scopes(request, *view_args, **view_kwargs)
+            )
+        etag, last_modified = caching.validators(request, versions)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = HttpResponse(_fill(request, page))
+        return caching.set_validators(response, etag, last_modified)
+
+
+@hole('header')
+def header(request, context):
+    return render_to_string('includes/header.html', request=request)
+
+
+@hole('switcher')
+def switcher(request, context, page):
+    return render_to_string(
+        'posts/includes/switcher.html',
+        {
+            'index_page': page == 'index',
+            'trending_page': page == 'trending',
+            'follow_page': page == 'follow',
+        },
+        request,
+    )
+
+
+@hole('follow_button')
+def follow_button(request, context, username):
+    following = False
+    if request.user.is_authenticated:
+        if context is not None and 'following' in context:
+            following = context['following']
+        else:
+            following = Follow.objects.filter(
+                user=request.user, author__username=username
+            ).exists()
+    return render_to_string(
+        'posts/includes/follow_button.html',
+        {'username': username, 'following': following},
+        request,
+    )
+
+
+@hole('post_edit_link')
+def post_edit_link(request, context, post_id, author_id):
+    if request.user.pk != int(author_id):
+        return ''
+    return render_to_string(
+        'posts/includes/post_edit_link.html', {'post_id': post_id}, request
+    )
+
+
+@hole('comment_form')
+def comment_form(request, context, post_id):
+    if not request.user.is_authenticated:
+        return ''
+    form = context['form'] if context is not None else CommentForm()
+    return render_to_string(
+        'posts/includes/comment_form.html',
+        {'post_id': post_id, 'form': form},
+        request,
+    )
+
+
+@hole('suggestions')
+def suggestions(request, context):
+    return render_to_string(
+        'posts/includes/suggestions.html',
+        {'suggestions': suggestions_for(request.user)},
+        request,
+    )
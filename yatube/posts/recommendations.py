@@ -0,0 +1,132 @@
+"""
+«На кого подписаться»: авторы, на которых подписаны авторы из ваших
+подписок, по числу таких подписок.
+
+rebuild() пересчитывает таблицу Recommendation целиком (раз в сутки, см.
+rebuild_recommendations), а refresh() после каждой подписки и отписки
+точно пересчитывает только затронутые пары. Страницы читают готовый
+top-K одним запросом по индексу (user, -score, author).
+"""
+from collections import defaultdict
+from heapq import nlargest
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+
+from . import caching
+from .feed import follower_ids
+from .models import Follow, Recommendation
+from yatube.settings import RECOMMENDATIONS_DEPTH, RECOMMENDATIONS_SHOWN
+
+# Подписка пользователя -> подписки того автора
+CANDIDATE = 'author__follower__author'
+
+
+def _top(user_id, scores, followed):
+    candidates = (
+        (author_id, score) for author_id, score in scores.items()
+        if author_id != user_id and author_id not in followed
+    )
+    # При равном score выше автор с меньшим id, как в _trim()
+    best = nlargest(
+        RECOMMENDATIONS_DEPTH, candidates,
+        key=lambda item: (item[1], -item[0]),
+    )
+    return [
+        Recommendation(user_id=user_id, author_id=author_id, score=score)
+        for author_id, score in best
+    ]
+
+
+def rebuild():
+    """Пересчитывает рекомендации всех пользователей; возвращает число."""
+    followed = defaultdict(set)
+    for user_id, author_id in Follow.objects.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        followed[user_id].add(author_id)
+    pairs = Follow.objects.filter(**{f'{CANDIDATE}__isnull': False}).values(
+        'user_id', CANDIDATE
+    ).annotate(score=Count('*')).order_by('user_id')
+    scores = defaultdict(dict)
+    for row in pairs.iterator():
+        scores[row['user_id']][row[CANDIDATE]] = row['score']
+    rows = []
+    for user_id, user_scores in scores.items():
+        rows += _top(user_id, user_scores, followed[user_id])
+    # Сбросить кеш нужно и тем, у кого рекомендаций больше нет
+    changed = set(scores) | set(
+        Recommendation.objects.values_list('user_id', flat=True).distinct()
+    )
+    with transaction.atomic():
+        Recommendation.objects.all().delete()
+        Recommendation.objects.bulk_create(rows, batch_size=500)
+    caching.invalidate(*(caching.follow_scope(pk) for pk in changed))
+    return len(rows)
+
+
+def _trim(user_ids):
+    """Оставляет каждому пользователю RECOMMENDATIONS_DEPTH лучших."""
+    best = Recommendation.objects.filter(
+        user_id=OuterRef('user_id')
+    ).order_by('-score', 'author_id').values('pk')[:RECOMMENDATIONS_DEPTH]
+    Recommendation.objects.filter(user_id__in=user_ids).exclude(
+        pk__in=Subquery(best)
+    ).delete()
+
+
+def refresh(user_ids, candidate_ids):
+    """Точно пересчитывает score пар (пользователь, кандидат)."""
+    user_ids = list(user_ids)
+    candidate_ids = list(candidate_ids)
+    if not user_ids or not candidate_ids:
+        return
+    pairs = Follow.objects.filter(
+        user_id__in=user_ids, **{f'{CANDIDATE}__in': candidate_ids}
+    ).values_list('user_id', CANDIDATE).annotate(score=Count('*'))
+    scores = defaultdict(dict)
+    for user_id, author_id, score in pairs:
+        scores[user_id][author_id] = score
+    followed = defaultdict(set)
+    for user_id, author_id in Follow.objects.filter(
+        user_id__in=user_ids, author_id__in=candidate_ids
+    ).values_list('user_id', 'author_id'):
+        followed[user_id].add(author_id)
+    rows = []
+    for user_id, user_scores in scores.items():
+        rows += _top(user_id, user_scores, followed[user_id])
+    Recommendation.objects.filter(
+        user_id__in=user_ids, author_id__in=candidate_ids
+    ).delete()
+    Recommendation.objects.bulk_create(rows)
+    _trim(user_ids)
+    caching.invalidate(*(caching.follow_scope(pk) for pk in user_ids))
+
+
+def follow_changed(user_id, author_id):
+    """
+    После подписки или отписки user -> author меняются рекомендации самого
+    user (подписки автора и сам автор) и его подписчиков (автор). Если
+    подписчиков больше FEED_FANOUT_LIMIT, их догонит ночной rebuild().
+    """
+    followees = Follow.objects.filter(user_id=author_id).values_list(
+        'author_id', flat=True
+    )
+    refresh([user_id], [author_id, *followees])
+    followers = follower_ids(user_id)
+    if followers:
+        refresh(followers, [author_id])
+
+
+def suggestions_for(user):
+    """Лучшие рекомендации пользователя одним запросом по индексу."""
+    if not user.is_authenticated:
+        return []
+    return list(
+        Recommendation.objects.filter(user=user).select_related('author')
+        .only(
+            'author', 'score', 'author__username',
+            'author__first_name', 'author__last_name',
+        )
+        .order_by('-score', 'author_id')[:RECOMMENDATIONS_SHOWN]
+    )
@@ -0,0 +1,172 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+Индекс — виртуальная таблица FTS5 posts_search: rowid совпадает с id поста,
+в колонках текст поста и склеенные комментарии к нему. Таблицу заводит
+миграция, в актуальном состоянии её держат сигналы. Если FTS5 недоступен
+(другая СУБД или SQLite без расширения), поиск идёт через LIKE.
+
+Строку поста нельзя дополнить одним комментарием: FTS5 заново разбирает
+её целиком. Поэтому после комментариев пост переиндексируется отложенно,
+не чаще раза в SEARCH_REINDEX_DELAY секунд, а не на каждый из них.
+"""
+import re
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Post
+
+TABLE = 'posts_search'
+# Совпадение в тексте поста весит больше, чем в комментариях
+RANK = f'bm25({TABLE}, 10.0, 1.0)'
+INDEX_SQL = (
+    f'INSERT INTO {TABLE} (rowid, text, comments) '
+    'SELECT id, text, ('
+    "SELECT coalesce(group_concat(text, ' '), '') FROM posts_comment "
+    'WHERE post_id = posts_post.id'
+    ') FROM posts_post'
+)
+
+
+@lru_cache(maxsize=None)
+def _has_index(database):
+    return TABLE in connection.introspection.table_names()
+
+
+def enabled():
+    return (
+        connection.vendor == 'sqlite'
+        and _has_index(connection.settings_dict['NAME'])
+    )
+
+
+def match_query(query):
+    """
+    Запрос пользователя -> выражение MATCH: каждое слово в кавычках
+    (операторы FTS5 в запросе не работают) и ищется по префиксу.
+    """
+    words = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def index_post(post_id):
+    if not enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+        cursor.execute(f'{INDEX_SQL} WHERE id = %s', [post_id])
+
+
+def _pending_key(post_id):
+    return f'search:pending:{post_id}'
+
+
+def _reindex(post_id):
+    try:
+        # Комментарий после снятия метки запланирует новый проход
+        cache.delete(_pending_key(post_id))
+        index_post(post_id)
+    finally:
+        # У потока таймера своё соединение с БД
+        connection.close()
+
+
+def _debounce(post_id):
+    delay = settings.SEARCH_REINDEX_DELAY
+    if cache.add(_pending_key(post_id), True, delay * 2):
+        timer = threading.Timer(delay, _reindex, [post_id])
+        timer.daemon = True
+        timer.start()
+
+
+def schedule_index(post_id):
+    """Переиндексирует пост после изменения его комментариев."""
+    if not settings.SEARCH_REINDEX_DELAY:
+        index_post(post_id)
+    elif enabled():
+        transaction.on_commit(lambda: _debounce(post_id))
+
+
+def remove_post(post_id):
+    if not enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild():
+    """Переиндексирует все посты, например после QuerySet.update()."""
+    if not enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(INDEX_SQL)
+
+
+class SearchResults:
+    """
+    Ранжированная выдача для Paginator: число совпадений и нужный срез
+    считаются по индексу, посты страницы загружаются одним запросом.
+    """
+
+    def __init__(self, match):
+        self.match = match
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {TABLE} WHERE {TABLE} MATCH %s',
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        offset = index.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+                f'ORDER BY {RANK}, rowid DESC LIMIT %s OFFSET %s',
+                [self.match, index.stop - offset, offset],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def filter_posts(queryset, query):
+    """Посты queryset, подходящие под запрос (без ранжирования)."""
+    match = match_query(query)
+    if not match:
+        return queryset.none()
+    if enabled():
+        # RawSQL в pk__in даёт IN ((SELECT ...)), и SQLite берёт одну строку
+        return queryset.extra(
+            where=[
+                f'posts_post.id IN '
+                f'(SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s)'
+            ],
+            params=[match],
+        )
+    for word in re.findall(r'\w+', query):
+        queryset = queryset.filter(
+            Q(text__icontains=word) | Q(comments__text__icontains=word)
+        )
+    return queryset.distinct()
+
+
+def search_posts(query):
+    """Выдача для страницы поиска: по релевантности, если есть индекс."""
+    match = match_query(query)
+    if match and enabled():
+        return SearchResults(match)
+    return filter_posts(Post.objects.for_feed(), query)
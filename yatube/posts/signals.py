@@ -0,0 +1,155 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (
+    caching, counters, feed, images, recommendations, search, trending
+)
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(post_save, sender=Post)
+def post_fan_out(sender, instance, created, **kwargs):
+    if created:
+        feed.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_backfill(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_purge(sender, instance, **kwargs):
+    feed.purge(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_group(sender, instance, **kwargs):
+    # При смене группы нужно сбросить кеш и старой группы
+    instance._old_group_id = None
+    if instance.pk:
+        instance._old_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_invalidate(sender, instance, **kwargs):
+    caching.invalidate_post(
+        instance, getattr(instance, '_old_group_id', None)
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_invalidate(sender, instance, **kwargs):
+    caching.invalidate(caching.GROUPS, caching.group_scope(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_invalidate(sender, instance, **kwargs):
+    caching.invalidate(
+        caching.post_scope(instance.post_id), caching.COMMENT_COUNTS
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_invalidate(sender, instance, **kwargs):
+    caching.invalidate(caching.follow_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Post)
+def post_count(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_author(instance.author_id, posts_count=1)
+        counters.bump_group(instance.group_id, 1)
+        return
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if old_group_id != instance.group_id:
+        counters.bump_group(old_group_id, -1)
+        counters.bump_group(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_uncount(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, posts_count=-1)
+    counters.bump_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_count(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_author(instance.author_id, comments_count=1)
+        counters.bump_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_uncount(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, comments_count=-1)
+    counters.bump_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_count(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_author(instance.user_id, following_count=1)
+        counters.bump_author(instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_uncount(sender, instance, **kwargs):
+    counters.bump_author(instance.user_id, following_count=-1)
+    counters.bump_author(instance.author_id, followers_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def post_image(sender, instance, **kwargs):
+    images.schedule_processing(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_index(sender, instance, **kwargs):
+    search.index_post(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindex(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_index(sender, instance, **kwargs):
+    search.schedule_index(instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_recommend(sender, instance, created, **kwargs):
+    if created:
+        recommendations.follow_changed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def unfollow_recommend(sender, instance, **kwargs):
+    recommendations.follow_changed(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_trending(sender, instance, created, **kwargs):
+    if created:
+        trending.record_activity(
+            instance.post_id,
+            instance.post.group_id,
+            instance.pub_date.timestamp(),
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_trending_group(sender, instance, created, **kwargs):
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if not created and old_group_id != instance.group_id:
+        trending.move_group(instance.pk, instance.group_id)
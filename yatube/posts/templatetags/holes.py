@@ -0,0 +1,13 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import page_cache
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **params):
+    """Персональный фрагмент: в кеше страниц остаётся только метка."""
+    html = page_cache.render_hole(name, context['request'], context, **params)
+    return mark_safe(page_cache.mark(name, params, html))
@@ -0,0 +1,118 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+
+JSON = {'HTTP_ACCEPT': 'application/json'}
+XHR = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+class AjaxEndpointsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='ajax_reader')
+        cls.author = User.objects.create_user(username='ajax_author')
+        cls.post = Post.objects.create(author=cls.author, text='Ajax post')
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+        self.follow_url = reverse(
+            'posts:profile_follow', args=[self.author.username]
+        )
+        self.unfollow_url = reverse(
+            'posts:profile_unfollow', args=[self.author.username]
+        )
+        self.comment_url = reverse('posts:add_comment', args=[self.post.pk])
+
+    def test_follow_json_returns_state_and_count(self):
+        response = self.client.post(self.follow_url, **JSON)
+        self.assertEqual(
+            response.json(), {'following': True, 'followers_count': 1}
+        )
+        response = self.client.post(self.unfollow_url, **JSON)
+        self.assertEqual(
+            response.json(), {'following': False, 'followers_count': 0}
+        )
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_fragment_is_new_button(self):
+        response = self.client.post(self.follow_url, **XHR)
+        self.assertTemplateUsed(response, 'posts/includes/follow_button.html')
+        self.assertContains(response, self.unfollow_url)
+        self.assertNotContains(response, '<html')
+
+    def test_anonymous_gets_401_instead_of_login_page(self):
+        self.client.logout()
+        login = reverse('users:login')
+        for url in (self.follow_url, self.unfollow_url, self.comment_url):
+            for headers in (JSON, XHR):
+                with self.subTest(url=url, headers=headers):
+                    response = self.client.post(
+                        url, {'text': 'Гость'}, **headers
+                    )
+                    self.assertEqual(response.status_code, 401)
+                    self.assertEqual(
+                        response.json()['login_url'], f'{login}?next={url}'
+                    )
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        response = self.client.post(self.follow_url)
+        self.assertRedirects(response, f'{login}?next={self.follow_url}')
+
+    def test_guest_sees_follow_button(self):
+        # Клик гостя получает 401 и уводит на login_url
+        self.client.logout()
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertContains(response, self.follow_url)
+
+    def test_comment_variants(self):
+        response = self.client.post(
+            self.comment_url, {'text': 'Через fetch'}, **XHR
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTemplateUsed(response, 'posts/includes/comment.html')
+        self.assertContains(response, 'Через fetch', status_code=201)
+        response = self.client.post(
+            self.comment_url, {'text': 'Через JSON'}, **JSON
+        )
+        comment = Comment.objects.get(text='Через JSON')
+        self.assertEqual(response.json()['id'], comment.pk)
+        self.assertEqual(response.json()['author'], self.reader.username)
+
+    def test_invalid_comment_returns_errors(self):
+        response = self.client.post(self.comment_url, {'text': ''}, **JSON)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.json()['errors'])
+        response = self.client.post(self.comment_url, {'text': ''}, **XHR)
+        self.assertEqual(response.status_code, 400)
+        self.assertTemplateUsed(response, 'posts/includes/comment_form.html')
+
+    def test_plain_requests_still_redirect(self):
+        self.assertRedirects(
+            self.client.post(self.comment_url, {'text': 'Без JS'}),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        self.assertRedirects(
+            self.client.post(self.follow_url),
+            reverse('posts:profile', args=[self.author.username]),
+        )
+
+    def test_fragment_is_cheaper_than_redirect(self):
+        # Первый комментарий заводит счётчики и строку «Обсуждаемого»
+        self.client.post(self.comment_url, {'text': 'Разогрев'}, **XHR)
+        counts = []
+        for extra, follow in ((XHR, False), ({}, True)):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(
+                    self.comment_url, {'text': 'Счёт'}, follow=follow,
+                    **extra
+                )
+            counts.append(len(queries))
+        self.assertLess(counts[0], counts[1])
@@ -0,0 +1,42 @@
+from django.test import TestCase, override_settings
+
+from posts import benchmark
+
+
+@override_settings(IMAGE_WORKERS=0)
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = benchmark.seed(
+            users=5, groups=2, posts=15, comments=10, follows=6
+        )
+
+    def test_every_route_is_measured(self):
+        report = benchmark.run(self.users[0], requests=2)
+        expected = {
+            f'{module.app_name}:{pattern.name}'
+            for module in benchmark.URL_MODULES
+            for pattern in module.urlpatterns
+        }
+        self.assertEqual(set(report), expected)
+        for name, stats in report.items():
+            with self.subTest(route=name):
+                self.assertLess(stats['status'], 400)
+                self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+                # Фрагменты из кеша могут вовсе обходиться без БД
+                self.assertIn('queries', stats)
+                self.assertGreater(stats['peak_kb'], 0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'routes': {
+            'posts:index': {'p95_ms': 10.0, 'queries': 3},
+            'posts:profile': {'p95_ms': 10.0, 'queries': 3},
+            'posts:group_page': {'p95_ms': 10.0, 'queries': 3},
+        }}
+        report = {'routes': {
+            'posts:index': {'p95_ms': 12.0, 'queries': 3},
+            'posts:profile': {'p95_ms': 20.0, 'queries': 4},
+        }}
+        problems = benchmark.compare(report, baseline, tolerance=0.25)
+        self.assertEqual(len(problems), 3)
+        self.assertFalse(any(p.startswith('posts:index') for p in problems))
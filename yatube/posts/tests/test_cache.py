@@ -1,10 +1,13 @@
-import time
+from io import StringIO
 
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.urls import reverse
 
-from ..models import Post, Group
+from ..models import Post, Group, Comment
+from yatube.settings import PAGE_POSTS_COUNT
 
 User = get_user_model()
 
@@ -14,7 +17,6 @@ class PagesCacheTests(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.username = 'Name'
-        cls.cache_sec = 21
 
         cls.user = User.objects.create_user(username=cls.username)
         cls.group = Group.objects.create(
@@ -28,10 +30,75 @@ class PagesCacheTests(TestCase):
             group=cls.group
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_cash_index_page(self):
         response_index = self.client.get(reverse('posts:index'))
         Post.objects.filter(pk=self.post.id).delete()
         self.assertContains(response_index, self.post.text)
-        time.sleep(self.cache_sec)
         response = self.client.get(reverse('posts:index'))
         self.assertNotContains(response, self.post.text)
+
+    def test_fragment_served_until_invalidated(self):
+        """update() bypasses signals, so the cached fragment is kept."""
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:group_page', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.username}),
+        ]
+        for page in pages:
+            self.client.get(page)
+        Post.objects.filter(pk=self.post.pk).update(text='Silent edit')
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertContains(self.client.get(page), self.post.text)
+
+        Post.objects.get(pk=self.post.pk).save()
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertContains(self.client.get(page), 'Silent edit')
+
+    def test_pages_have_separate_fragments(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Bulk post {i}')
+            for i in range(PAGE_POSTS_COUNT)
+        )
+        first = self.client.get(reverse('posts:index'))
+        second = self.client.get(reverse('posts:index') + '?page=2')
+        self.assertNotContains(first, self.post.text)
+        self.assertContains(second, self.post.text)
+
+    def test_comment_invalidates_post_detail(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        Comment.objects.create(
+            author=self.user, post=self.post, text='Fresh comment'
+        )
+        self.assertContains(self.client.get(url), 'Fresh comment')
+
+    def test_warm_cache_fills_fragments(self):
+        call_command('warm_cache', stdout=StringIO())
+        Post.objects.filter(pk=self.post.pk).update(text='Silent edit')
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:group_page', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.username}),
+        ]
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertContains(self.client.get(page), self.post.text)
+
+    def test_warm_cache_fills_page_cache(self):
+        cache.clear()
+        call_command('warm_cache', stdout=StringIO())
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:group_page', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.username}),
+        ]
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.client.get(page)
+                names = [template.name for template in response.templates]
+                self.assertNotIn('base.html', names)
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.utils import MAX_DB_INT, NEXT, PREVIOUS, encode_cursor
+from yatube.settings import COMMENTS_PAGE_SIZE
+
+User = get_user_model()
+
+
+class CommentBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.total = COMMENTS_PAGE_SIZE + 5
+        for number in range(cls.total):
+            Comment.objects.create(
+                author=cls.user, post=cls.post, text=f'Комментарий {number}'
+            )
+
+    def texts(self, comments):
+        return [comment.text for comment in comments]
+
+    def test_detail_shows_first_batch_and_count(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        comments = response.context['comments']
+        self.assertEqual(
+            self.texts(comments),
+            [f'Комментарий {n}' for n in range(COMMENTS_PAGE_SIZE)],
+        )
+        self.assertContains(response, f'Комментариев: {self.total}')
+        self.assertContains(response, 'data-load-more')
+
+    def test_load_more_returns_rest_as_fragment(self):
+        detail = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        cursor = detail.context['comments'].next_cursor
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'cursor': cursor})
+        self.assertEqual(
+            self.texts(response.context['comments']),
+            [
+                f'Комментарий {n}'
+                for n in range(COMMENTS_PAGE_SIZE, self.total)
+            ],
+        )
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'data-load-more')
+
+    def test_batch_is_bounded(self):
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        response = self.client.get(url)
+        self.assertEqual(
+            len(response.context['comments'].items), COMMENTS_PAGE_SIZE
+        )
+        self.assertContains(response, 'data-load-more')
+
+    def test_new_comment_resets_fragment(self):
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        cursor = self.client.get(url).context['comments'].next_cursor
+        self.client.get(url, {'cursor': cursor})
+        Comment.objects.create(
+            author=self.user, post=self.post, text='Свежий комментарий'
+        )
+        response = self.client.get(url, {'cursor': cursor})
+        self.assertContains(response, 'Свежий комментарий')
+
+    def test_bad_cursor_is_rejected(self):
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        comment = self.post.comments.first()
+        huge = SimpleNamespace(pub_date=comment.pub_date, pk=MAX_DB_INT + 1)
+        for cursor in (
+            'not-a-cursor',
+            encode_cursor(huge, NEXT),
+            encode_cursor(comment, PREVIOUS),
+        ):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
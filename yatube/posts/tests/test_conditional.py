@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    """Неизменённые страницы отдаются как 304 без обращения к БД."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='EtagAuthor')
+        cls.reader = User.objects.create_user(username='EtagReader')
+        cls.group = Group.objects.create(
+            title='Etag group', slug='etag-group', description='-'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Etag post'
+        )
+        cls.pages = [
+            reverse('posts:index'),
+            reverse('posts:group_page', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'EtagAuthor'}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in self.pages:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('ETag', response)
+                with self.assertNumQueries(0):
+                    repeated = self.revalidate(url, response)
+                self.assertEqual(repeated.status_code, 304)
+
+    def test_if_modified_since_for_anonymous(self):
+        url = self.pages[0]
+        response = self.client.get(url)
+        repeated = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(repeated.status_code, 304)
+
+    def test_new_post_changes_feeds(self):
+        responses = {url: self.client.get(url) for url in self.pages}
+        Post.objects.create(author=self.author, group=self.group, text='New')
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url, response).status_code,
+                                 200)
+
+    def test_comment_changes_post_detail(self):
+        url = self.pages[-1]
+        response = self.client.get(url)
+        Comment.objects.create(
+            author=self.reader, post=self.post, text='Etag comment'
+        )
+        self.assertContains(self.revalidate(url, response), 'Etag comment')
+
+    def test_user_specific_pages(self):
+        url = self.pages[2]
+        anonymous = self.client.get(url)
+        self.client.force_login(self.reader)
+        response = self.client.get(url)
+        self.assertNotEqual(anonymous['ETag'], response['ETag'])
+        self.assertNotIn('Last-Modified', response)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertContains(self.revalidate(url, response), 'Отписаться')
+
+    def test_follow_index(self):
+        url = reverse('posts:follow_index')
+        self.client.force_login(self.reader)
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertContains(self.revalidate(url, response), 'Etag post')
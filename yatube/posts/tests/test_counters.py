@@ -0,0 +1,99 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..counters import stats_for
+from ..models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='CountAuthor')
+        cls.reader = User.objects.create_user(username='CountReader')
+        cls.group = Group.objects.create(
+            title='Count group', slug='count-group', description='-'
+        )
+        cls.other_group = Group.objects.create(
+            title='Other group', slug='other-count-group', description='-'
+        )
+
+    def refresh(self):
+        self.author.refresh_from_db()
+        self.reader.refresh_from_db()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+
+    def test_counters_follow_writes(self):
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Post'
+        )
+        comment = Comment.objects.create(
+            author=self.reader, post=post, text='Comment'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.refresh()
+        post.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 1)
+        self.assertEqual(self.author.stats.followers_count, 1)
+        self.assertEqual(self.reader.stats.following_count, 1)
+        self.assertEqual(self.reader.stats.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+
+        post.group = self.other_group
+        post.save()
+        self.refresh()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        comment.delete()
+        Follow.objects.all().delete()
+        post.delete()
+        self.refresh()
+        self.assertEqual(self.author.stats.posts_count, 0)
+        self.assertEqual(self.author.stats.followers_count, 0)
+        self.assertEqual(self.reader.stats.comments_count, 0)
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_user_without_stats_row(self):
+        self.assertEqual(stats_for(self.reader).posts_count, 0)
+
+    def test_recount_stats_repairs_drift(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, group=self.group, text=str(i))
+            for i in range(3)
+        )
+        AuthorStats.objects.filter(user=self.author).delete()
+        call_command('recount_stats', stdout=mock.Mock())
+        self.refresh()
+        self.assertEqual(self.author.stats.posts_count, 3)
+        self.assertEqual(self.reader.stats.posts_count, 0)
+        self.assertEqual(self.group.posts_count, 3)
+
+    def test_migration_fills_counters_for_existing_data(self):
+        migration = import_module('posts.migrations.0020_backfill_counters')
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Post'
+        )
+        Comment.objects.create(author=self.reader, post=post, text='-')
+        Follow.objects.create(user=self.reader, author=self.author)
+        # Данные до 0012_counters: строк и счётчиков ещё нет
+        AuthorStats.objects.all().delete()
+        Post.objects.update(comments_count=0)
+        Group.objects.update(posts_count=0)
+        migration.backfill_counters(apps, None)
+        self.refresh()
+        post.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 1)
+        self.assertEqual(self.author.stats.followers_count, 1)
+        self.assertEqual(self.reader.stats.following_count, 1)
+        self.assertEqual(self.reader.stats.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
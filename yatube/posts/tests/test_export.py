@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import export
+from posts.models import Comment, Follow, Post
+from posts.tests.test_images import image_file
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='export_owner')
+        cls.other = User.objects.create_user(username='export_other')
+        cls.post = Post.objects.create(author=cls.owner, text='Мой пост')
+        cls.foreign = Post.objects.create(author=cls.other, text='Чужой')
+        Comment.objects.create(author=cls.owner, post=cls.foreign, text='Да')
+        Comment.objects.create(author=cls.other, post=cls.post, text='Нет')
+        Follow.objects.create(user=cls.owner, author=cls.other)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def download(self, **params):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('posts:export'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_ndjson_contains_only_own_records(self):
+        response, body = self.download()
+        self.assertEqual(
+            response['Content-Type'], 'application/x-ndjson; charset=utf-8'
+        )
+        records = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(
+            [(r['type'], r.get('text')) for r in records],
+            [('posts', 'Мой пост'), ('comments', 'Да'), ('follows', None)],
+        )
+        self.assertEqual(records[2]['author'], self.other.username)
+
+    def test_csv_single_dataset(self):
+        response, body = self.download(format='csv', dataset='comments')
+        self.assertIn('comments.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(body.decode())))
+        self.assertEqual(rows[0], list(export.DATASETS['comments'][1]))
+        self.assertEqual(rows[1][2:], [
+            str(self.foreign.pk), self.owner.username, 'Да'
+        ])
+        self.assertEqual(len(rows), 2)
+
+    def test_zip_with_images(self):
+        post = Post.objects.create(
+            author=self.owner, text='С картинкой', image=image_file()
+        )
+        response, body = self.download(format='csv', images='1')
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(body)) as zf:
+            self.assertEqual(zf.namelist(), [
+                'posts.csv', 'comments.csv', 'follows.csv',
+                f'images/{post.image.name}',
+            ])
+            with post.image.open() as f:
+                self.assertEqual(
+                    zf.read(f'images/{post.image.name}'), f.read()
+                )
+            self.assertIn('С картинкой', zf.read('posts.csv').decode())
+
+    def test_bad_params_and_anonymous(self):
+        response = self.client.get(reverse('posts:export'))
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(self.owner)
+        for params in ({'format': 'xml'}, {'dataset': 'users'}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('posts:export'), params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_rows_are_read_in_chunks(self):
+        for number in range(5):
+            Post.objects.create(author=self.owner, text=f'Пост {number}')
+        chunk_sizes = []
+        original = QuerySet.iterator
+
+        def iterator(queryset, chunk_size=2000):
+            chunk_sizes.append(chunk_size)
+            return original(queryset, chunk_size)
+
+        with mock.patch('posts.export.EXPORT_CHUNK_SIZE', 2), \
+                mock.patch.object(QuerySet, 'iterator', iterator):
+            rows = list(export.rows('posts', self.owner))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(chunk_sizes, [2])
+
+    def test_command_writes_file(self):
+        path = os.path.join(TEMP_MEDIA_ROOT, 'export.ndjson')
+        call_command(
+            'export_posts', dataset=['posts'], output=path,
+            stderr=io.StringIO(),
+        )
+        with open(path, encoding='utf-8') as f:
+            texts = [json.loads(line)['text'] for line in f]
+        self.assertEqual(texts, ['Мой пост', 'Чужой'])
+        call_command(
+            'export_posts', user=self.other.username, zip=True, output=path,
+            stderr=io.StringIO(),
+        )
+        with zipfile.ZipFile(path) as zf:
+            self.assertEqual(
+                zf.read('posts.ndjson').decode().count('\n'), 1
+            )
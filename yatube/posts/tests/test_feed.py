@@ -0,0 +1,160 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import FeedEntry, Follow, Post
+from yatube.settings import FEED_FANOUT_LIMIT, PAGE_POSTS_COUNT
+
+User = get_user_model()
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='FeedReader')
+        cls.author = User.objects.create_user(username='FeedAuthor')
+        cls.stranger = User.objects.create_user(username='FeedStranger')
+        cls.old_post = Post.objects.create(author=cls.author, text='Old')
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def feed_ids(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed_ids(), [self.old_post.pk])
+
+        new_post = Post.objects.create(author=self.author, text='New')
+        Post.objects.create(author=self.stranger, text='Not followed')
+        self.assertEqual(self.feed_ids(), [new_post.pk, self.old_post.pk])
+
+    def test_unfollow_purges_entries(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed_ids(), [])
+
+    def test_feed_is_trimmed_to_depth(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch('posts.feed.FEED_DEPTH', 2):
+            posts = [
+                Post.objects.create(author=self.author, text=str(i))
+                for i in range(3)
+            ]
+        self.assertEqual(
+            list(FeedEntry.objects.filter(user=self.reader)
+                 .order_by('-pub_date').values_list('post_id', flat=True)),
+            [posts[2].pk, posts[1].pk]
+        )
+
+    def test_fan_out_to_many_followers_trims_by_range(self):
+        depth = 3
+        User.objects.bulk_create(
+            User(username=f'feed_follower_{i}')
+            for i in range(FEED_FANOUT_LIMIT)
+        )
+        followers = list(User.objects.filter(
+            username__startswith='feed_follower_'
+        ).values_list('pk', flat=True))
+        Follow.objects.bulk_create(
+            Follow(user_id=user_id, author=self.author)
+            for user_id in followers
+        )
+        old_posts = [
+            Post.objects.create(author=self.stranger, text=str(i))
+            for i in range(depth)
+        ]
+        FeedEntry.objects.bulk_create(
+            FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers for post in old_posts
+        )
+        with mock.patch('posts.feed.FEED_DEPTH', depth):
+            with CaptureQueriesContext(connection) as queries:
+                new_post = Post.objects.create(author=self.author, text='New')
+        trim_queries = [
+            query['sql'] for query in queries.captured_queries
+            if FeedEntry._meta.db_table in query['sql']
+            and not query['sql'].startswith('INSERT')
+        ]
+        # Граница и удаление на подписчика, без подзапроса на строку
+        self.assertEqual(len(trim_queries), 2 * len(followers))
+        for sql in trim_queries:
+            self.assertNotIn('(SELECT', sql)
+        self.assertEqual(
+            FeedEntry.objects.filter(user_id__in=followers).count(),
+            depth * len(followers),
+        )
+        self.assertEqual(
+            FeedEntry.objects.filter(post=new_post).count(), len(followers)
+        )
+        self.assertFalse(FeedEntry.objects.filter(post=old_posts[0]).exists())
+
+    def test_migration_backfills_existing_follows(self):
+        migration = import_module('posts.migrations.0019_backfill_feeds')
+        celebrity = User.objects.create_user(username='FeedCelebrity')
+        new_post = Post.objects.create(author=self.stranger, text='New')
+        Post.objects.create(author=celebrity, text='Pulled')
+        Follow.objects.bulk_create([
+            Follow(user=self.reader, author=self.author),
+            Follow(user=self.reader, author=self.stranger),
+            Follow(user=self.reader, author=celebrity),
+            Follow(user=self.author, author=celebrity),
+        ])
+        with override_settings(FEED_DEPTH=1, FEED_FANOUT_LIMIT=1):
+            migration.backfill_feeds(apps, None)
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user_id', 'post_id')),
+            [(self.reader.pk, new_post.pk)],
+        )
+
+    def test_celebrity_author_is_pulled(self):
+        with mock.patch('posts.feed.FEED_FANOUT_LIMIT', 0):
+            Follow.objects.create(user=self.reader, author=self.author)
+            new_post = Post.objects.create(author=self.author, text='New')
+            self.assertFalse(FeedEntry.objects.exists())
+            self.assertEqual(
+                self.feed_ids(), [new_post.pk, self.old_post.pk]
+            )
+
+    def test_pulled_and_fanned_out_posts_are_merged(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch('posts.feed.FEED_FANOUT_LIMIT', 0):
+            Follow.objects.create(user=self.reader, author=self.stranger)
+            posts = [
+                Post.objects.create(author=author, text=str(i))
+                for i, author in enumerate(
+                    [self.author, self.stranger] * (PAGE_POSTS_COUNT // 2)
+                )
+            ]
+            # Автор стал популярным, но его записи остались в FeedEntry
+            self.author.stats.followers_count = 2
+            self.author.stats.save()
+            expected = [post.pk for post in reversed(posts)]
+            expected.append(self.old_post.pk)
+            first = self.client.get(reverse('posts:follow_index'))
+            page = first.context['page_obj']
+            second = self.client.get(
+                reverse('posts:follow_index'), {'cursor': page.next_cursor}
+            ).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in page] + [post.pk for post in second],
+            expected,
+        )
+
+    def test_rebuild_feeds_command(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', stdout=mock.Mock())
+        self.assertEqual(self.feed_ids(), [self.old_post.pk])
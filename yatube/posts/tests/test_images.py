@@ -0,0 +1,127 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core import metrics
+from ..forms import PostForm
+from ..images import process_image
+from ..models import Post
+from ..uploads import LimitedTemporaryFileUploadHandler
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(name='photo.png', size=(120, 80), **save_kwargs):
+    buffer = BytesIO()
+    image_format = 'JPEG' if name.endswith('.jpg') else 'PNG'
+    Image.new('RGB', size, (200, 30, 30)).save(
+        buffer, image_format, **save_kwargs
+    )
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ImageAuthor')
+        self.post = Post.objects.create(
+            author=self.user, text='With image', image=image_file()
+        )
+
+    def test_process_image(self):
+        self.assertEqual(self.post.thumbs, {})
+        process_image(self.post.pk)
+        self.post.refresh_from_db()
+        thumb = self.post.thumbs['feed']
+        self.assertEqual((thumb['width'], thumb['height']), (960, 339))
+        path = thumb['url'][len(settings.MEDIA_URL):]
+        with default_storage.open(path) as file:
+            self.assertEqual(Image.open(file).size, (960, 339))
+
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, thumb['url'])
+
+    def test_background_thumbnails_are_measured(self):
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir, ignore_errors=True)
+        with override_settings(METRICS_DIR=metrics_dir):
+            process_image(self.post.pk)
+            text = metrics.exposition()
+        self.assertIn(
+            'yatube_thumbnail_seconds_count{view="post-images"} 1\n', text
+        )
+
+    def test_image_reencoded_without_exif(self):
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera maker'
+        self.post.image = image_file('exif.jpg', (3000, 1000), exif=exif)
+        self.post.save()
+        source = self.post.image.name
+        with mock.patch('posts.images.POST_IMAGE_MAX_SIDE', 1500):
+            process_image(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertNotEqual(self.post.image.name, source)
+        self.assertFalse(default_storage.exists(source))
+        with default_storage.open(self.post.image.name) as file:
+            image = Image.open(file)
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (1500, 500))
+            self.assertTrue(image.info.get('progressive'))
+            self.assertFalse(image.getexif())
+        self.assertTrue(self.post.thumbs)
+
+    def test_thumbnails_reset_when_image_replaced(self):
+        process_image(self.post.pk)
+        self.post.refresh_from_db()
+        self.post.image = image_file('other.png')
+        self.post.save()
+        self.assertEqual(self.post.thumbs, {})
+
+
+class UploadLimitsTests(TestCase):
+    def make_form(self, image):
+        return PostForm(data={'text': 'Text'}, files={'image': image})
+
+    def test_valid_image(self):
+        self.assertTrue(self.make_form(image_file()).is_valid())
+
+    def test_too_many_bytes(self):
+        with mock.patch('posts.forms.POST_IMAGE_MAX_BYTES', 10):
+            form = self.make_form(image_file())
+            self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def test_too_many_pixels(self):
+        with mock.patch('posts.forms.POST_IMAGE_MAX_PIXELS', 100):
+            form = self.make_form(image_file())
+            self.assertFalse(form.is_valid())
+        self.assertIn('пикселей', form.errors['image'][0])
+
+    def test_upload_handler_stops_writing_after_limit(self):
+        handler = LimitedTemporaryFileUploadHandler()
+        handler.new_file('image', 'big.png', 'image/png', None)
+        with mock.patch('posts.uploads.POST_IMAGE_MAX_BYTES', 8):
+            for start in range(0, 40, 4):
+                handler.receive_data_chunk(b'x' * 4, start)
+        uploaded = handler.file_complete(40)
+        self.assertEqual(uploaded.size, 40)
+        self.assertEqual(len(uploaded.read()), 8)
+        uploaded.close()
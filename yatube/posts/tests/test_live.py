@@ -0,0 +1,114 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import caching
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(LIVE_TIMEOUT=0.2)
+class LiveUpdatesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='live_user')
+        cls.group = Group.objects.create(
+            title='Live group', slug='live-group', description='-'
+        )
+        cls.post = Post.objects.create(author=cls.user, text='Первый')
+
+    def poll(self, scope, **params):
+        response = self.client.get(
+            reverse('posts:live'), {'scope': scope, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_handshake_then_new_post_ids(self):
+        state = self.poll('index')
+        self.assertEqual(state['ids'], [])
+        self.assertEqual(state['after'], self.post.pk)
+        new = Post.objects.create(author=self.user, text='Второй')
+        change = self.poll(
+            'index', version=state['version'], after=state['after']
+        )
+        self.assertEqual(change['ids'], [new.pk])
+        self.assertEqual(change['after'], new.pk)
+        self.assertNotEqual(change['version'], state['version'])
+
+    def test_timeout_without_changes_costs_no_queries(self):
+        state = self.poll('index')
+        started = time.monotonic()
+        with self.assertNumQueries(0):
+            change = self.poll(
+                'index', version=state['version'], after=state['after']
+            )
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(change['ids'], [])
+        self.assertEqual(change['version'], state['version'])
+
+    def test_scopes(self):
+        group_scope = f'group:{self.group.pk}'
+        comments_scope = f'post:{self.post.pk}'
+        group_state = self.poll(group_scope)
+        comments_state = self.poll(comments_scope)
+        Post.objects.create(author=self.user, text='Без группы')
+        in_group = Post.objects.create(
+            author=self.user, text='В группе', group=self.group
+        )
+        comment = Comment.objects.create(
+            author=self.user, post=self.post, text='Ответ'
+        )
+        self.assertEqual(
+            self.poll(group_scope, version=group_state['version'])['ids'],
+            [in_group.pk],
+        )
+        self.assertEqual(
+            self.poll(
+                comments_scope, version=comments_state['version']
+            )['ids'],
+            [comment.pk],
+        )
+
+    def test_write_wakes_waiter(self):
+        version = caching.scope_versions(caching.INDEX)[0]
+        timer = threading.Timer(0.05, caching.invalidate, [caching.INDEX])
+        timer.start()
+        started = time.monotonic()
+        current = caching.wait_for_change(caching.INDEX, version, 5)
+        timer.join()
+        self.assertNotEqual(current, version)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_event_stream(self):
+        version = caching.scope_versions(caching.INDEX)[0]
+        new = Post.objects.create(author=self.user, text='Для потока')
+        response = self.client.get(
+            reverse('posts:live'),
+            {'scope': 'index', 'version': version, 'after': self.post.pk},
+            HTTP_ACCEPT='text/event-stream',
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('event: change', body)
+        self.assertIn(f'"ids": [{new.pk}]', body)
+
+    def test_bad_parameters(self):
+        for params in (
+            {'scope': 'follow:1'},
+            {'scope': 'index', 'version': 'x'},
+            {'scope': 'index', 'timeout': 'nan'},
+            {'scope': 'index', 'timeout': 'inf'},
+            {'scope': 'index', 'timeout': '-inf'},
+            {'scope': f'post:{2 ** 64}'},
+            {'scope': 'index', 'after': str(2 ** 64)},
+            {'scope': 'index', 'after': '-1'},
+            {},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('posts:live'), params)
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,127 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import replicas
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=60)
+class PageCacheTests(TestCase):
+    """Страницы целиком из кеша, персональные куски — на каждый запрос."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='PageAuthor')
+        cls.reader = User.objects.create_user(username='PageReader')
+        cls.post = Post.objects.create(author=cls.author, text='Page post')
+        cls.index = reverse('posts:index')
+        cls.profile = reverse(
+            'posts:profile', kwargs={'username': cls.author.username}
+        )
+        cls.detail = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.pk}
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def cached(self, url):
+        """Прогревает страницу и возвращает ответ из кеша."""
+        # Первый запрос запоминает id объекта, второй сохраняет страницу
+        self.client.get(url)
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertFromCache(response)
+        return response
+
+    def assertFromCache(self, response):
+        # Рендерятся только шаблоны дырок, сама страница — нет
+        names = [template.name for template in response.templates]
+        self.assertNotIn('base.html', names)
+
+    def test_anonymous_page_without_queries(self):
+        for url in (self.index, self.profile, self.detail):
+            with self.subTest(url=url):
+                fresh = self.client.get(url)
+                self.client.get(url)
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+                self.assertFromCache(response)
+                self.assertEqual(response.content, fresh.content)
+                self.assertNotIn(b'<!--hole', response.content)
+
+    def test_cached_renders_read_primary(self):
+        pinned = []
+
+        def db_for_read(router, model, **hints):
+            pinned.append(replicas._state.pinned)
+            return replicas.PRIMARY
+
+        comments = reverse(
+            'posts:post_comments', kwargs={'post_id': self.post.pk}
+        )
+        with mock.patch.object(
+            replicas.PrimaryReplicaRouter, 'db_for_read', db_for_read
+        ):
+            for url in (self.index, self.profile, self.detail, comments):
+                self.client.get(url)
+        # Реплика могла бы отстать и положить старый HTML под новую версию
+        self.assertTrue(pinned)
+        self.assertTrue(all(pinned))
+
+    def test_served_until_scope_changes(self):
+        self.cached(self.index)
+        Post.objects.filter(pk=self.post.pk).update(text='Silent edit')
+        self.assertContains(self.client.get(self.index), 'Page post')
+        Post.objects.get(pk=self.post.pk).save()
+        self.assertContains(self.client.get(self.index), 'Silent edit')
+
+    def test_personal_fragments_for_logged_in_user(self):
+        self.cached(self.index)
+        self.client.force_login(self.reader)
+        response = self.cached(self.index)
+        self.assertContains(response, 'Пользователь: PageReader')
+        self.assertContains(response, reverse('posts:follow_index'))
+
+    def test_follow_button_is_personal(self):
+        self.client.force_login(self.reader)
+        self.assertContains(self.cached(self.profile), 'Подписаться')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertContains(self.cached(self.profile), 'Отписаться')
+
+    def test_profile_copy_is_shared_between_users(self):
+        self.cached(self.profile)
+        self.client.force_login(self.reader)
+        response = self.client.get(self.profile)
+        self.assertFromCache(response)
+        self.assertContains(response, 'Подписаться')
+        etag = response['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(self.profile, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFromCache(response)
+        self.assertContains(response, 'Отписаться')
+
+    def test_comment_form_and_edit_link(self):
+        anonymous = self.cached(self.detail)
+        edit_url = reverse('posts:post_edit', kwargs={'post_id': self.post.pk})
+        self.assertNotContains(anonymous, 'csrfmiddlewaretoken')
+        self.client.force_login(self.reader)
+        response = self.cached(self.detail)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(response, edit_url)
+        self.client.force_login(self.author)
+        self.assertContains(self.cached(self.detail), edit_url)
+
+    def test_cached_page_supports_conditional_get(self):
+        response = self.cached(self.index)
+        repeated = self.client.get(
+            self.index, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(repeated.status_code, 304)
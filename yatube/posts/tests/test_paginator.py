@@ -0,0 +1,120 @@
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, InvalidPage
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post
+from ..utils import (
+    MAX_DB_INT, NEXT, CursorPaginator, decode_cursor, encode_cursor
+)
+from yatube.settings import PAGE_POSTS_COUNT
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.posts_count = PAGE_POSTS_COUNT * 2 + 3
+        cls.user = User.objects.create_user(username='PaginatorUser')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Test post {i}')
+            for i in range(cls.posts_count)
+        )
+        cls.expected_ids = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_page(self, **params):
+        response = self.client.get(reverse('posts:index'), params)
+        return response.context['page_obj']
+
+    def ids(self, page):
+        return [post.pk for post in page]
+
+    def test_first_page(self):
+        page = self.get_page()
+        self.assertIsInstance(page.paginator, CursorPaginator)
+        self.assertEqual(self.ids(page), self.expected_ids[:PAGE_POSTS_COUNT])
+        self.assertFalse(page.previous_cursor)
+        self.assertTrue(page.next_cursor)
+
+    def test_walk_forward_and_back(self):
+        first = self.get_page()
+        second = self.get_page(cursor=first.next_cursor)
+        third = self.get_page(cursor=second.next_cursor)
+        self.assertEqual(
+            self.ids(second),
+            self.expected_ids[PAGE_POSTS_COUNT:PAGE_POSTS_COUNT * 2]
+        )
+        self.assertEqual(self.ids(third), self.expected_ids[-3:])
+        self.assertFalse(third.next_cursor)
+
+        back = self.get_page(cursor=third.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(second))
+        self.assertTrue(back.previous_cursor)
+        first_again = self.get_page(cursor=back.previous_cursor)
+        self.assertEqual(self.ids(first_again), self.ids(first))
+        self.assertFalse(first_again.previous_cursor)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        page = self.get_page(cursor='not-a-cursor')
+        self.assertEqual(self.ids(page), self.expected_ids[:PAGE_POSTS_COUNT])
+
+    def test_cursor_beyond_integer_range_falls_back_to_first_page(self):
+        newest = Post.objects.get(pk=self.expected_ids[0])
+        cursor = encode_cursor(
+            SimpleNamespace(pub_date=newest.pub_date, pk=MAX_DB_INT + 1), NEXT
+        )
+        self.assertIsNone(decode_cursor(cursor))
+        page = self.get_page(cursor=cursor)
+        self.assertEqual(self.ids(page), self.expected_ids[:PAGE_POSTS_COUNT])
+
+    def test_huge_page_number_falls_back_to_first_page(self):
+        for number in ('99999999999999999999999', str(MAX_DB_INT)):
+            with self.subTest(number=number):
+                page = self.get_page(page=number)
+                self.assertEqual(
+                    self.ids(page), self.expected_ids[:PAGE_POSTS_COUNT]
+                )
+
+    def test_legacy_page_number(self):
+        page = self.get_page(page=3)
+        self.assertEqual(self.ids(page), self.expected_ids[-3:])
+        self.assertTrue(page.previous_cursor)
+        self.assertFalse(page.next_cursor)
+
+    def test_feed_does_not_count_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get_page(cursor=self.get_page().next_cursor)
+        self.assertFalse(
+            [q for q in queries.captured_queries if 'COUNT(' in q['sql']]
+        )
+
+    def test_standard_page_api(self):
+        first = self.get_page()
+        self.assertTrue(first.has_next())
+        self.assertFalse(first.has_previous())
+        self.assertTrue(first.has_other_pages())
+        self.assertEqual(first.next_page_number(), 2)
+        with self.assertRaises(EmptyPage):
+            first.previous_page_number()
+        second = self.get_page(cursor=first.next_cursor)
+        self.assertTrue(second.has_next())
+        self.assertTrue(second.has_previous())
+        # Номер страницы по курсору неизвестен
+        with self.assertRaises(InvalidPage):
+            second.next_page_number()
+        last = self.get_page(page=3)
+        self.assertFalse(last.has_next())
+        self.assertEqual(last.previous_page_number(), 2)
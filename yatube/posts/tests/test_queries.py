@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueryCountTests(TestCase):
+    """Число запросов не зависит от количества постов и комментариев."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='QueryReader')
+        cls.authors = [
+            User.objects.create_user(username=f'QueryAuthor{i}')
+            for i in range(3)
+        ]
+        cls.groups = [
+            Group.objects.create(
+                title=f'Group {i}', slug=f'query-group-{i}', description='-'
+            )
+            for i in range(2)
+        ]
+        for i in range(12):
+            Post.objects.create(
+                author=cls.authors[i % 3],
+                group=cls.groups[i % 2],
+                text=f'Post {i}',
+            )
+        cls.post = Post.objects.first()
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+            Comment.objects.create(
+                author=author, post=cls.post, text='Comment'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_pages_query_count(self):
+        pages = {
+            reverse('posts:index'): 1,
+            reverse('posts:group_page', args=[self.groups[0].slug]): 2,
+            reverse('posts:profile', args=[self.authors[0].username]): 2,
+            reverse('posts:post_detail', args=[self.post.pk]): 2,
+        }
+        for url, queries in pages.items():
+            with self.subTest(url=url), self.assertNumQueries(queries):
+                self.client.get(url)
+
+    def test_follow_index_query_count(self):
+        self.client.force_login(self.reader)
+        # сессия, пользователь, популярные авторы, id ленты, посты,
+        # рекомендации
+        with self.assertNumQueries(6):
+            self.client.get(reverse('posts:follow_index'))
+
+    def test_cached_fragments_skip_comment_query(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
@@ -0,0 +1,109 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, FeedEntry, Follow, Group, Post
+from ..utils import NEXT, encode_cursor
+
+User = get_user_model()
+
+
+class FeedQueryPlanTests(TestCase):
+    """EXPLAIN каждого запроса лент: без полного скана и сортировки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='PlanReader')
+        cls.author = User.objects.create_user(username='PlanAuthor')
+        cls.group = Group.objects.create(
+            title='Plan group', slug='plan-group', description='-'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Plan post'
+        )
+        Comment.objects.create(
+            author=cls.reader, post=cls.post, text='Plan comment'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedPlan(self, sql):
+        where = sql.partition(' WHERE ')[2].partition(' ORDER BY ')[0]
+        for step in self.plan(sql):
+            self.assertNotIn('TEMP B-TREE', step, sql)
+            self.assertNotIn('CORRELATED', step, sql)
+            if step.startswith('SCAN '):
+                self.assertIn(' USING ', step, sql)
+                # SCAN таблицы, по которой есть фильтр, обходит весь индекс
+                # до LIMIT: ограничен только диапазон (SEARCH)
+                table = step.split()[1]
+                self.assertNotIn(f'"{table}".', where, sql)
+
+    def cursor(self, url):
+        page = self.client.get(url).context.get('page_obj')
+        if page is None or not page.object_list:
+            return ''
+        return encode_cursor(page.object_list[0], NEXT)
+
+    def test_feed_queries_use_indexes(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_page', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:follow_index'),
+            reverse('posts:trending'),
+            reverse('posts:group_trending', args=[self.group.slug]),
+        ]
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+                self.client.get(url + '?cursor=' + self.cursor(url))
+            for query in queries.captured_queries:
+                with self.subTest(url=url, sql=query['sql'][:60]):
+                    self.assertIndexedPlan(query['sql'])
+
+    def test_follow_feed_merges_index_ranges(self):
+        celebrity = User.objects.create_user(username='PlanCelebrity')
+        with mock.patch('posts.feed.FEED_FANOUT_LIMIT', 0):
+            Follow.objects.create(user=self.reader, author=celebrity)
+            Post.objects.create(author=celebrity, text='Pulled post')
+            url = reverse('posts:follow_index')
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+                self.client.get(url + '?cursor=' + self.cursor(url))
+        feed = [
+            query['sql'] for query in queries.captured_queries
+            if 'UNION' in query['sql']
+        ]
+        self.assertEqual(len(feed), 3)
+        for sql in feed:
+            plan = self.plan(sql)
+            self.assertIn('MERGE (UNION)', plan)
+            self.assertIndexedPlan(sql)
+
+    def test_feed_trim_uses_index(self):
+        with mock.patch('posts.feed.FEED_DEPTH', 0):
+            with CaptureQueriesContext(connection) as queries:
+                Post.objects.create(author=self.author, text='Trimmed')
+        trim = [
+            query['sql'] for query in queries.captured_queries
+            if FeedEntry._meta.db_table in query['sql']
+            and not query['sql'].startswith('INSERT')
+        ]
+        self.assertEqual(len(trim), 2)
+        for sql in trim:
+            self.assertIndexedPlan(sql)
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import recommendations
+from posts.models import Follow, Recommendation
+
+User = get_user_model()
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.a, cls.b, cls.c, cls.d = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'author_a', 'author_b', 'author_c',
+                         'author_d')
+        )
+        for user, author in (
+            (cls.reader, cls.a), (cls.reader, cls.b),
+            (cls.a, cls.c), (cls.b, cls.c), (cls.b, cls.d),
+            (cls.c, cls.reader),
+        ):
+            Follow.objects.create(user=user, author=author)
+
+    def table(self, user):
+        return list(
+            Recommendation.objects.filter(user=user)
+            .order_by('-score', 'author_id')
+            .values_list('author__username', 'score')
+        )
+
+    def snapshot(self):
+        return set(
+            Recommendation.objects.values_list('user_id', 'author_id', 'score')
+        )
+
+    def test_scores_count_shared_follows(self):
+        self.assertEqual(
+            self.table(self.reader), [('author_c', 2), ('author_d', 1)]
+        )
+        # Подписчик reader видит тех, на кого подписан reader
+        self.assertEqual(
+            self.table(self.c), [('author_a', 1), ('author_b', 1)]
+        )
+
+    def test_incremental_updates_match_rebuild(self):
+        Follow.objects.create(user=self.reader, author=self.c)
+        Follow.objects.filter(user=self.b, author=self.d).delete()
+        Follow.objects.create(user=self.a, author=self.d)
+        incremental = self.snapshot()
+        recommendations.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(self.table(self.reader), [('author_d', 1)])
+
+    def test_suggestions_on_pages(self):
+        self.client.force_login(self.reader)
+        for url in (
+            reverse('posts:follow_index'),
+            reverse('posts:profile', args=[self.a.username]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Возможно, вам интересны')
+                self.assertContains(
+                    response,
+                    reverse('posts:profile_follow', args=['author_c']),
+                )
+
+    def test_suggestions_are_one_query(self):
+        with self.assertNumQueries(1):
+            suggestions = recommendations.suggestions_for(self.reader)
+            self.assertEqual(suggestions[0].author.username, 'author_c')
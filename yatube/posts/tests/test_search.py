@@ -0,0 +1,117 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(SEARCH_REINDEX_DELAY=0)
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='search_user')
+        cls.group = Group.objects.create(
+            title='Search group', slug='search-group', description='-'
+        )
+        cls.in_text = Post.objects.create(
+            author=cls.user, text='Заметки про кактусы и суккуленты'
+        )
+        cls.in_comment = Post.objects.create(
+            author=cls.user, text='Совсем другая тема', group=cls.group
+        )
+        Comment.objects.create(
+            author=cls.user, post=cls.in_comment, text='Зато про кактусы'
+        )
+        cls.other = Post.objects.create(author=cls.user, text='Про погоду')
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return list(response.context['page_obj'])
+
+    def test_index_is_available(self):
+        self.assertTrue(search.enabled())
+
+    def test_ranked_by_post_text_first(self):
+        self.assertEqual(
+            self.search('КАКТУСЫ'), [self.in_text, self.in_comment]
+        )
+
+    def test_prefix_and_operators_are_plain_words(self):
+        self.assertEqual(self.search('суккул'), [self.in_text])
+        self.assertEqual(self.search('"OR* NEAR('), [])
+        self.assertEqual(self.search(''), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.other.text = 'Про кактусы в мороз'
+        self.other.save()
+        self.assertIn(self.other, self.search('мороз'))
+        Comment.objects.filter(post=self.in_comment).delete()
+        self.assertEqual(
+            set(self.search('кактусы')), {self.in_text, self.other}
+        )
+        Post.objects.get(pk=self.in_text.pk).delete()
+        self.assertEqual(self.search('кактусы'), [self.other])
+
+    def test_pagination(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Кактус номер {i}')
+            for i in range(12)
+        )
+        search.rebuild()
+        first = self.search('кактус')
+        second = self.search('кактус', page=2)
+        self.assertEqual(len(first), 10)
+        self.assertEqual(len(second), 4)
+        self.assertFalse(set(first) & set(second))
+
+    def test_like_fallback(self):
+        with mock.patch('posts.search.enabled', return_value=False):
+            found = set(self.search('кактусы'))
+        self.assertEqual(found, {self.in_text, self.in_comment})
+
+    def test_admin_uses_index(self):
+        admin = User.objects.create_superuser(
+            'search_admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кактусы'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.in_text, self.in_comment},
+        )
+
+
+@override_settings(SEARCH_REINDEX_DELAY=5)
+class DebouncedIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_comments_reindex_post_once_per_delay(self):
+        user = User.objects.create_user(username='debounce_user')
+        post = Post.objects.create(author=user, text='Тихий пост')
+        with mock.patch('posts.search.threading.Timer') as timer:
+            for number in range(3):
+                Comment.objects.create(
+                    author=user, post=post, text=f'Кактусы {number}'
+                )
+                search._debounce(post.pk)
+        timer.assert_called_once_with(5, search._reindex, [post.pk])
+        self.assertFalse(search.filter_posts(Post.objects, 'кактусы'))
+        with mock.patch('posts.search.connection.close'):
+            search._reindex(post.pk)
+        self.assertEqual(
+            list(search.filter_posts(Post.objects, 'кактусы')), [post]
+        )
+        with mock.patch('posts.search.threading.Timer') as timer:
+            search._debounce(post.pk)
+        timer.assert_called_once()
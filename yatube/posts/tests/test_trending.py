@@ -0,0 +1,115 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import trending
+from posts.models import Comment, Group, Post, TrendingScore
+from yatube.settings import TRENDING_ERA, TRENDING_HALF_LIFE
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='trend_author')
+        cls.group = Group.objects.create(
+            title='Trend group', slug='trend-group', description='-'
+        )
+        cls.quiet, cls.busy, cls.grouped = (
+            Post.objects.create(author=cls.author, text=text, group=group)
+            for text, group in (
+                ('Quiet post', None),
+                ('Busy post', None),
+                ('Grouped post', cls.group),
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(author=self.author, post=post, text='-')
+
+    def test_comments_rank_posts(self):
+        self.comment(self.quiet)
+        self.comment(self.busy, 3)
+        self.comment(self.grouped, 2)
+        self.assertEqual(
+            list(trending.trending_posts()),
+            [self.busy, self.grouped, self.quiet],
+        )
+        self.assertEqual(
+            list(trending.trending_posts(self.group.pk)), [self.grouped]
+        )
+
+    def test_old_activity_decays(self):
+        now = time.time()
+        old = now - 3 * TRENDING_HALF_LIFE
+        for _ in range(3):
+            trending.record_activity(self.busy.pk, None, old, now)
+        trending.record_activity(self.quiet.pk, None, now, now)
+        # 3 / 2 ** 3 < 1
+        self.assertEqual(
+            list(trending.trending_posts()), [self.quiet, self.busy]
+        )
+
+    def test_compact_carries_era_and_drops_cold_posts(self):
+        start = trending.era_of(time.time()) * TRENDING_ERA
+        for _ in range(2):
+            trending.record_activity(self.busy.pk, None, start - 1, start - 1)
+        trending.record_activity(
+            self.quiet.pk, None, start - TRENDING_ERA + 1, start - 1
+        )
+        self.assertEqual(trending.compact(start + 1), 1)
+        score = TrendingScore.objects.get(post=self.busy)
+        self.assertEqual(score.era, trending.era_of(start))
+        self.assertAlmostEqual(
+            score.score, 2 * trending.weight(start - 1, score.era)
+        )
+        # Комментарий новой эпохи складывается с перенесёнными очками
+        trending.record_activity(self.grouped.pk, None, start + 1, start + 1)
+        self.assertEqual(
+            list(trending.trending_posts()), [self.busy, self.grouped]
+        )
+
+    def test_group_change_moves_score(self):
+        self.comment(self.busy)
+        post = Post.objects.get(pk=self.busy.pk)
+        post.group = self.group
+        post.save()
+        self.assertEqual(
+            list(trending.trending_posts(self.group.pk)), [self.busy]
+        )
+
+    def test_pages_read_feed_in_one_query(self):
+        self.comment(self.busy, 2)
+        self.comment(self.grouped)
+        for url, expected in (
+            (reverse('posts:trending'), [self.busy, self.grouped]),
+            (
+                reverse('posts:group_trending', args=[self.group.slug]),
+                [self.grouped],
+            ),
+        ):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(list(response.context['posts']), expected)
+                feed = [
+                    query for query in queries.captured_queries
+                    if 'posts_trendingscore' in query['sql']
+                ]
+                self.assertEqual(len(feed), 1)
+
+    def test_new_comment_refreshes_page(self):
+        url = reverse('posts:trending')
+        self.assertNotContains(self.client.get(url), 'Quiet post')
+        self.comment(self.quiet)
+        self.assertContains(self.client.get(url), 'Quiet post')
@@ -1,6 +1,7 @@
 from http import HTTPStatus
 
 from django.test import TestCase, Client
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 
 from ..models import Group, Post
@@ -10,6 +11,7 @@ User = get_user_model()
 
 class StaticURLTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def test_static_pages(self):
@@ -45,6 +47,7 @@ class PostsUrlTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -3,6 +3,7 @@ import shutil
 
 from django.conf import settings
 from django.test import TestCase, Client
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -70,6 +71,7 @@ class PostsPagesTest(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
         self.auth_follower_client = Client()
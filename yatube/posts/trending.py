@@ -0,0 +1,109 @@
+"""
+«Обсуждаемое»: посты по недавней активности в комментариях.
+
+Каждый комментарий добавляет посту вклад, который экспоненциально
+затухает с периодом полураспада TRENDING_HALF_LIFE. Чтобы не пересчитывать
+все очки со временем, вклад хранится в прямой (forward) форме:
+exp((t - начало эпохи) / tau) вместо exp(-(сейчас - t) / tau). Порядок
+постов от этого не меняется, а старые очки остаются неизменными, поэтому
+лента читается одним диапазоном индекса (era, score).
+
+Эпоха длиной TRENDING_ERA ограничивает рост множителя. Первый комментарий
+новой эпохи (и compact_trending по cron) переносит очки прошлой эпохи в
+текущую и удаляет остывшие посты.
+"""
+import math
+import time
+
+from django.core.cache import cache
+from django.db.models import Case, F, FloatField, Value, When
+
+from . import caching
+from .models import PostQuerySet, TrendingScore
+from yatube.settings import (
+    TRENDING_ERA, TRENDING_HALF_LIFE, TRENDING_MIN_SCORE, TRENDING_SIZE
+)
+
+TAU = TRENDING_HALF_LIFE / math.log(2)
+# Во сколько раз очки прошлой эпохи меньше в масштабе следующей
+CARRY = math.exp(-TRENDING_ERA / TAU)
+
+
+def era_of(timestamp):
+    return int(timestamp // TRENDING_ERA)
+
+
+def weight(timestamp, era):
+    """Вклад события в момент timestamp в масштабе эпохи era."""
+    return math.exp((timestamp - era * TRENDING_ERA) / TAU)
+
+
+def _add(queryset, era, amount):
+    return queryset.update(
+        era=era,
+        score=Case(
+            When(era=era, then=F('score') + amount),
+            When(era=era - 1, then=F('score') * CARRY + amount),
+            default=Value(amount),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def record_activity(post_id, group_id, when, now=None):
+    """Добавляет посту вклад комментария, написанного в момент when."""
+    era = era_of(time.time() if now is None else now)
+    # Первая запись эпохи приводит остальные очки к её масштабу
+    if cache.add(f'trending:era:{era}', True, TRENDING_ERA * 2):
+        compact(now)
+    amount = weight(when, era)
+    scores = TrendingScore.objects.filter(post_id=post_id)
+    if not _add(scores, era, amount):
+        TrendingScore.objects.get_or_create(
+            post_id=post_id,
+            defaults={'group_id': group_id, 'era': era, 'score': 0},
+        )
+        _add(scores, era, amount)
+    caching.invalidate(caching.TRENDING)
+
+
+def move_group(post_id, group_id):
+    """Пост перенесли в другую группу: копия group_id должна совпадать."""
+    if TrendingScore.objects.filter(post_id=post_id).update(
+        group_id=group_id
+    ):
+        caching.invalidate(caching.TRENDING)
+
+
+def compact(now=None):
+    """
+    Переносит очки прошлой эпохи в текущую и удаляет посты, чей текущий
+    счёт ниже TRENDING_MIN_SCORE. Возвращает число удалённых строк.
+    """
+    now = time.time() if now is None else now
+    era = era_of(now)
+    TrendingScore.objects.filter(era=era - 1).update(
+        era=era, score=F('score') * CARRY
+    )
+    deleted, _ = TrendingScore.objects.exclude(era=era).delete()
+    cold, _ = TrendingScore.objects.filter(
+        era=era, score__lt=TRENDING_MIN_SCORE * weight(now, era)
+    ).delete()
+    caching.invalidate(caching.TRENDING)
+    return deleted + cold
+
+
+def trending_posts(group_id=None):
+    """
+    Самые обсуждаемые посты (всего сайта или группы): один запрос, который
+    идёт по индексу (era, score) или (group, era, score) без сортировки.
+    """
+    scores = TrendingScore.objects.select_related(
+        'post__author', 'post__group'
+    ).only(*(f'post__{field}' for field in PostQuerySet.FEED_FIELDS))
+    if group_id is not None:
+        scores = scores.filter(group_id=group_id)
+    return [
+        score.post
+        for score in scores.order_by('-era', '-score')[:TRENDING_SIZE]
+    ]
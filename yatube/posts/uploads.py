@@ -0,0 +1,20 @@
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+from yatube.settings import POST_IMAGE_MAX_BYTES
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет загрузку во временный файл по чанкам, не держа её в памяти.
+    После POST_IMAGE_MAX_BYTES чанки отбрасываются, но размер считается
+    полностью, чтобы форма сообщила о превышении лимита.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received <= POST_IMAGE_MAX_BYTES:
+            self.file.write(raw_data)
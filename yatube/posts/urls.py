@@ -10,10 +10,30 @@ urlpatterns = [
     path('', views.index, name='index'),
     # Посты группы
     path('group/<slug:slug>/', views.group_posts, name='group_page'),
+    # Самые обсуждаемые посты группы
+    path(
+        'group/<slug:slug>/trending/',
+        views.group_trending,
+        name='group_trending'
+    ),
+    # Самые обсуждаемые посты
+    path('trending/', views.trending_index, name='trending'),
     # Профайл пользователя
     path('profile/<str:username>/', views.profile, name='profile'),
     # Просмотр записи
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    # Следующая порция комментариев к посту (HTML-фрагмент)
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
+    # Новые посты и комментарии: long-poll и server-sent events
+    path('live/', views.live_updates, name='live'),
+    # Поиск по постам и комментариям
+    path('search/', views.search, name='search'),
+    # Выгрузка своих постов, комментариев и подписок
+    path('export/', views.export_data, name='export'),
     # Создание новой записи
     path('create/', views.post_create, name='post_create'),
     # Редактирование записи
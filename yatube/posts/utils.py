@@ -1,9 +1,192 @@
-from django.core.paginator import Paginator
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from types import MethodType
 
-from yatube.settings import PAGE_POSTS_COUNT
+from django.core.paginator import EmptyPage, InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from yatube.settings import COMMENTS_PAGE_SIZE, PAGE_POSTS_COUNT
+
+# Направление перехода, зашитое в курсор
+NEXT = 'n'
+PREVIOUS = 'p'
+# Самое большое целое SQLite: id и OFFSET больше него база не примет
+MAX_DB_INT = 2 ** 63 - 1
+
+
+def encode_cursor(obj, direction):
+    """Упаковывает (pub_date, id) записи в непрозрачный токен."""
+    raw = f'{direction}|{obj.pub_date.isoformat()}|{obj.pk}'
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (direction, pub_date, pk) или None для битого курсора."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, pub_date, pk = (
+            urlsafe_b64decode(padded).decode().split('|')
+        )
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    if not 0 <= pk <= MAX_DB_INT:
+        return None
+    return direction, pub_date, pk
+
+
+def _has_next(page):
+    return page.next_cursor is not None
+
+
+def _has_previous(page):
+    return page.previous_cursor is not None
+
+
+def _neighbour(page, exists, delta):
+    if not exists:
+        raise EmptyPage('Соседней страницы нет')
+    if page.number is None:
+        raise InvalidPage(
+            'Номер страницы по курсору неизвестен, '
+            'используйте next_cursor/previous_cursor'
+        )
+    return page.number + delta
+
+
+def _next_page_number(page):
+    return _neighbour(page, page.has_next(), 1)
+
+
+def _previous_page_number(page):
+    return _neighbour(page, page.has_previous(), -1)
+
+
+# Методы Page, которые по умолчанию считают записи через paginator.count
+CURSOR_PAGE_METHODS = {
+    'has_next': _has_next,
+    'has_previous': _has_previous,
+    'next_page_number': _next_page_number,
+    'previous_page_number': _previous_page_number,
+}
+
+
+class CursorPaginator(Paginator):
+    """
+    Keyset-пагинация по (pub_date, id) вместо OFFSET + COUNT(*). Число
+    записей лентам не нужно, поэтому count, num_pages и page_range не
+    используются и выполняют обычный COUNT(*).
+
+    object_list — PostQuerySet или другой источник с теми же order_by(),
+    older(), newer() и срезами (см. feed.Feed).
+    """
+    ordering = ('-pub_date', '-pk')
+
+    def __init__(self, object_list, per_page, **kwargs):
+        super().__init__(
+            object_list.order_by(*self.ordering), per_page, **kwargs
+        )
+
+    def _slice(self, queryset):
+        """Берёт на одну запись больше, чтобы узнать о следующей странице."""
+        rows = list(queryset[:self.per_page + 1])
+        return rows[:self.per_page], len(rows) > self.per_page
+
+    def _build_page(self, rows, has_previous, has_next, number=None):
+        """
+        Page с курсорами соседних страниц в атрибутах next_cursor и
+        previous_cursor (None, если соседа нет). Тип остаётся Page, а
+        has_next(), has_previous() и номера соседей отвечают по курсорам:
+        номер известен только для первой страницы и для ?page=N.
+        """
+        page = Page(rows, number, self)
+        page.next_cursor = (
+            encode_cursor(rows[-1], NEXT) if has_next and rows else None
+        )
+        page.previous_cursor = (
+            encode_cursor(rows[0], PREVIOUS)
+            if has_previous and rows else None
+        )
+        for name, method in CURSOR_PAGE_METHODS.items():
+            setattr(page, name, MethodType(method, page))
+        return page
+
+    def cursor_page(self, cursor=None):
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            rows, has_next = self._slice(self.object_list)
+            return self._build_page(rows, False, has_next, number=1)
+        direction, pub_date, pk = decoded
+        if direction == NEXT:
+            rows, has_next = self._slice(
+                self.object_list.older(pub_date, pk)
+            )
+            return self._build_page(rows, True, has_next)
+        rows, has_previous = self._slice(self.object_list.newer(pub_date, pk))
+        return self._build_page(rows[::-1], has_previous, True)
+
+    def offset_page(self, number):
+        """Старые ссылки вида ?page=N: OFFSET без COUNT(*)."""
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        bottom = (number - 1) * self.per_page
+        if bottom + self.per_page + 1 > MAX_DB_INT:
+            # Такой страницы заведомо нет, как и любой пустой
+            return self.cursor_page()
+        rows, has_next = self._slice(self.object_list[bottom:])
+        if not rows and number > 1:
+            return self.cursor_page()
+        return self._build_page(rows, number > 1, has_next, number=number)
 
 
 def get_page_obj(obj_list, request):
+    paginator = CursorPaginator(obj_list, PAGE_POSTS_COUNT)
     page_number = request.GET.get('page')
-    paginator = Paginator(obj_list, PAGE_POSTS_COUNT)
-    return paginator.get_page(page_number)
+    if page_number is not None and 'cursor' not in request.GET:
+        return paginator.offset_page(page_number)
+    return paginator.cursor_page(request.GET.get('cursor'))
+
+
+class CommentBatch:
+    """
+    Порция комментариев поста по возрастанию (pub_date, id) и курсор
+    следующей. Запрос выполняется при первом обращении, поэтому при
+    попадании в кеш фрагмента его нет вовсе.
+    """
+
+    def __init__(self, comments, post_id, cursor=None,
+                 size=COMMENTS_PAGE_SIZE):
+        self.comments = comments.order_by('pub_date', 'pk')
+        self.post_id = post_id
+        self.cursor = cursor
+        self.size = size
+
+    @cached_property
+    def _rows(self):
+        comments = self.comments
+        decoded = decode_cursor(self.cursor) if self.cursor else None
+        if decoded is not None and decoded[0] == NEXT:
+            _, pub_date, pk = decoded
+            comments = comments.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+            )
+        return list(comments[:self.size + 1])
+
+    @property
+    def items(self):
+        return self._rows[:self.size]
+
+    @property
+    def next_cursor(self):
+        if len(self._rows) > self.size:
+            return encode_cursor(self._rows[self.size - 1], NEXT)
+        return None
+
+    def __iter__(self):
+        return iter(self.items)
@@ -1,14 +1,77 @@
+import math
+from functools import wraps
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
+
+from core import replicas
+from core.db import serialized
+from core.metrics import observe_uploads
 
-from .models import Post, Group, User, Comment, Follow
+from .models import Comment, Post, Group, User, Follow
 from .forms import PostForm, CommentForm
-from .utils import get_page_obj
+from . import caching, export, live, trending
+from .counters import followers_count, stats_for
+from .feed import feed_for
+from .search import search_posts
+from .utils import (
+    MAX_DB_INT, NEXT, CommentBatch, decode_cursor, get_page_obj
+)
+from yatube.settings import PAGE_POSTS_COUNT
+
+
+def _index_scopes(request):
+    return (caching.INDEX,)
+
+
+def _group_scopes(request, slug):
+    group_id = caching.known_id('group', slug)
+    return group_id and (caching.group_scope(group_id),)
+
+
+def _profile_page_scopes(request, username):
+    author_id = caching.known_id('author', username)
+    return author_id and (caching.author_scope(author_id),)
+
+
+def _profile_scopes(request, username):
+    # Подписка меняет только кнопку-дырку, но ETag должен её учесть
+    page_scopes = _profile_page_scopes(request, username)
+    return page_scopes and (
+        *page_scopes, caching.follow_scope(request.user.pk)
+    )
+
+
+def _post_scopes(request, post_id):
+    # Счётчик постов автора в карточке зависит от области автора
+    author_id = caching.known_id('post_author', post_id)
+    return author_id and (
+        caching.post_scope(post_id), caching.author_scope(author_id)
+    )
+
+
+def _trending_scopes(request):
+    return (caching.TRENDING, caching.INDEX)
+
+
+def _group_trending_scopes(request, slug):
+    group_id = caching.known_id('group', slug)
+    return group_id and (caching.TRENDING, caching.group_scope(group_id))
+
+
+def _follow_scopes(request):
+    # Новый пост любого автора меняет версию главной
+    return (caching.INDEX, caching.follow_scope(request.user.pk))
 
 
+@caching.conditional(_index_scopes, shared=True)
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.select_related('group').all()
+    post_list = Post.objects.for_feed()
     page_obj = get_page_obj(post_list, request)
     text = 'Последние обновления на сайте'
     index_page = True
@@ -16,32 +79,69 @@ def index(request):
         'text': text,
         'page_obj': page_obj,
         'index_page': index_page,
+        **caching.fragment_context(request, caching.INDEX),
     }
     return render(request, template, context)
 
 
+@caching.conditional(_group_scopes, shared=True)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
+    caching.remember_id('group', slug, group.pk)
     template = 'posts/group_list.html'
-    posts = group.posts.all()
+    posts = group.posts.for_feed()
     page_obj = get_page_obj(posts, request)
     context = {
         'group': group,
         'page_obj': page_obj,
+        **caching.fragment_context(request, caching.group_scope(group.pk)),
     }
 
     return render(request, template, context)
 
 
+@caching.conditional(_trending_scopes, shared=True)
+def trending_index(request):
+    text = 'Обсуждаемое'
+    context = {
+        'text': text,
+        'posts': trending.trending_posts(),
+        **caching.fragment_context(
+            request, caching.TRENDING, caching.INDEX
+        ),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@caching.conditional(_group_trending_scopes, shared=True)
+def group_trending(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    caching.remember_id('group', slug, group.pk)
+    context = {
+        'group': group,
+        'text': f'Обсуждаемое в сообществе {group.title}',
+        'posts': trending.trending_posts(group.pk),
+        **caching.fragment_context(
+            request, caching.TRENDING, caching.group_scope(group.pk)
+        ),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@caching.conditional(_profile_scopes, shared=_profile_page_scopes)
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    user_posts = user.posts.all()
-    user_posts_count = user_posts.count()
+    user = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    caching.remember_id('author', username, user.pk)
+    user_posts = user.posts.for_feed()
+    user_posts_count = stats_for(user).posts_count
     page_obj = get_page_obj(user_posts, request)
     context = {
         'author': user,
         'user_posts_count': user_posts_count,
         'page_obj': page_obj,
+        **caching.fragment_context(request, caching.author_scope(user.pk)),
     }
     if request.user.is_authenticated:
         following = Follow.objects.filter(
@@ -51,34 +151,207 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@caching.conditional(_post_scopes, shared=True)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    user = post.author
-    user_posts = user.posts.all()
-    user_posts_count = user_posts.count()
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    caching.remember_id('post_author', post.pk, post.author_id)
+    user_posts_count = stats_for(post.author).posts_count
     title = post.text[:30]
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post_id=post_id)
+    # Первая порция; запрос ленивый и при попадании в кеш не выполняется
+    comments = CommentBatch(post.comments.select_related('author'), post.pk)
     context = {
         'post': post,
         'user_posts_count': user_posts_count,
         'title': title,
         'comments': comments,
         'form': form,
+        **caching.fragment_context(request, caching.post_scope(post.pk)),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая порция комментариев HTML-фрагментом для «Показать ещё»."""
+    cursor = request.GET.get('cursor')
+    decoded = decode_cursor(cursor) if cursor else None
+    # Битый курсор повторил бы первую порцию под уже показанными
+    if cursor and (decoded is None or decoded[0] != NEXT):
+        return JsonResponse({'detail': 'Некорректный курсор'}, status=400)
+    # Порция попадёт в кеш фрагмента, см. caching.conditional
+    replicas.pin()
+    comments = CommentBatch(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        post_id,
+        cursor,
+    )
+    context = {
+        'comments': comments,
+        **caching.fragment_context(request, caching.post_scope(post_id)),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+def _live_params(request):
+    """(scope, version, after, timeout) из запроса; ValueError, если мусор."""
+    scope = live.parse_scope(request.GET.get('scope'))
+    if scope is None:
+        raise ValueError(request.GET.get('scope'))
+    # EventSource при переподключении присылает последний id события
+    version = (
+        request.GET.get('version') or request.META.get('HTTP_LAST_EVENT_ID')
+    )
+    timeout = float(request.GET.get('timeout', settings.LIVE_TIMEOUT))
+    # nan проходит сквозь min/max, и ожидание никогда не кончается
+    if not math.isfinite(timeout):
+        raise ValueError(timeout)
+    after = int(request.GET.get('after', 0))
+    if not 0 <= after <= MAX_DB_INT:
+        raise ValueError(after)
+    return (
+        scope,
+        int(version) if version else None,
+        after,
+        min(max(timeout, 0), settings.LIVE_TIMEOUT),
+    )
+
+
+def live_updates(request):
+    """
+    Новые записи области. Без version сразу отдаёт текущую версию, иначе
+    отвечает, как только версия сдвинется, или по таймауту. С заголовком
+    Accept: text/event-stream отдаёт поток server-sent events.
+    """
+    try:
+        scope, version, after, timeout = _live_params(request)
+    except ValueError:
+        return JsonResponse({'detail': 'Некорректные параметры'}, status=400)
+    if version is None:
+        version = caching.scope_versions(scope)[0]
+        after = after or live.last_id(scope)
+    if 'text/event-stream' in request.META.get('HTTP_ACCEPT', ''):
+        response = StreamingHttpResponse(
+            live.events(scope, version, after, timeout),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        return response
+    if request.GET.get('version') is None:
+        return JsonResponse({'version': version, 'ids': [], 'after': after})
+    return JsonResponse(live.poll(scope, version, after, timeout))
+
+
+@login_required
+def export_data(request):
+    """
+    «Скачать мои данные»: посты, комментарии и подписки пользователя
+    потоком в NDJSON или CSV, с zip=1 — архивом, с images=1 — с картинками.
+    """
+    fmt = request.GET.get('format', 'ndjson')
+    datasets = request.GET.getlist('dataset') or list(export.DATASETS)
+    if fmt not in export.FORMATS or not set(datasets) <= set(
+        export.DATASETS
+    ):
+        return JsonResponse({'detail': 'Некорректные параметры'}, status=400)
+    images = request.GET.get('images') == '1'
+    # В один CSV помещается только один набор
+    zipped = (
+        request.GET.get('zip') == '1' or images
+        or (fmt == 'csv' and len(datasets) > 1)
+    )
+    if zipped:
+        content = export.archive(fmt, datasets, request.user, images)
+    else:
+        content = export.stream(fmt, datasets, request.user)
+    response = StreamingHttpResponse(
+        content, content_type=export.content_type(fmt, zipped)
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{export.filename(fmt, datasets, zipped)}"'
+    )
+    return response
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    # Выдача ранжирована по релевантности, поэтому страницы по номерам
+    paginator = Paginator(search_posts(query), PAGE_POSTS_COUNT)
+    context = {
+        'query': query,
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def _ajax_format(request):
+    """
+    'json' для Accept: application/json, 'html' (фрагмент) для XHR с
+    X-Requested-With, None — обычная форма или ссылка, нужен редирект.
+    """
+    if 'application/json' in request.META.get('HTTP_ACCEPT', ''):
+        return 'json'
+    if request.is_ajax():
+        return 'html'
+    return None
+
+
+def _ajax_login_required(view):
+    """
+    login_required, но fetch-запросы гостя получают 401 с адресом входа:
+    редирект fetch проходит молча и вставил бы в страницу форму входа.
+    """
+    protected = login_required(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.user.is_authenticated or _ajax_format(request) is None:
+            return protected(request, *args, **kwargs)
+        login = redirect_to_login(request.get_full_path())
+        return JsonResponse(
+            {'detail': 'Нужно войти', 'login_url': login.url}, status=401
+        )
+    return wrapper
+
+
+@serialized
+def _save(instance):
+    instance.save()
+
+
+@serialized
+def _set_following(user, author, following):
+    if following:
+        Follow.objects.get_or_create(user=user, author=author)
+    else:
+        Follow.objects.filter(user=user, author=author).delete()
+
+
+def _follow_response(request, author, following):
+    """Новое состояние подписки вместо повторного рендера профиля."""
+    variant = _ajax_format(request)
+    if variant is None:
+        return redirect('posts:profile', username=author.username)
+    if variant == 'json':
+        return JsonResponse({
+            'following': following,
+            'followers_count': followers_count(author.pk),
+        })
+    return render(request, 'posts/includes/follow_button.html', {
+        'username': author.username, 'following': following
+    })
+
+
 @login_required
 def post_create(request):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None)
     context = {'form': form}
+    observe_uploads(request, form.files)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        _save(post)
         return redirect('posts:profile', username=request.user.username)
     else:
         return render(request, 'posts/create_post.html', context)
@@ -98,30 +371,50 @@ def post_edit(request, post_id):
     if not request.user.id == post_to_edit.author_id:
         return redirect('posts:post_detail', post_id=post_id)
     else:
+        observe_uploads(request, form.files)
         if form.is_valid():
-            form.save()
+            _save(form.save(commit=False))
             return redirect('posts:post_detail', post_id=post_id)
         else:
             return render(request, 'posts/create_post.html', context)
 
 
-@login_required
+@_ajax_login_required
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
     post = get_object_or_404(Post, pk=post_id)
-    if form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = post
-        comment.save()
+    variant = _ajax_format(request)
+    if not form.is_valid():
+        if variant == 'json':
+            return JsonResponse({'errors': form.errors}, status=400)
+        if variant == 'html':
+            return render(request, 'posts/includes/comment_form.html', {
+                'post_id': post_id, 'form': form
+            }, status=400)
+        return redirect('posts:post_detail', post_id=post_id)
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = post
+    _save(comment)
+    if variant == 'json':
+        return JsonResponse({
+            'id': comment.pk,
+            'author': request.user.username,
+            'text': comment.text,
+            'pub_date': comment.pub_date,
+        }, status=201)
+    if variant == 'html':
+        return render(
+            request, 'posts/includes/comment.html', {'comment': comment},
+            status=201,
+        )
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@caching.conditional(_follow_scopes)
 def follow_index(request):
-    follows = Follow.objects.filter(user=request.user)
-    following_users = User.objects.filter(following__in=follows)
-    posts = Post.objects.filter(author__in=following_users)
+    posts = feed_for(request.user)
     follow_page = True
     page_obj = get_page_obj(posts, request)
     text = 'Посты авторов, на которых вы подписаны'
@@ -133,21 +426,16 @@ def follow_index(request):
     return render(request, 'posts/follow.html', context)
 
 
-@login_required
+@_ajax_login_required
 def profile_follow(request, username):
     follower = get_object_or_404(User, username=username)
     if request.user != follower:
-        Follow.objects.get_or_create(
-            user=request.user,
-            author=follower,
-        )
-    return redirect('posts:profile', username=username)
+        _set_following(request.user, follower, True)
+    return _follow_response(request, follower, request.user != follower)
 
 
-@login_required
+@_ajax_login_required
 def profile_unfollow(request, username):
-    Follow.objects.filter(
-        user=request.user,
-        author=get_object_or_404(User, username=username)
-    ).delete()
-    return redirect('posts:profile', username=username)
+    author = get_object_or_404(User, username=username)
+    _set_following(request.user, author, False)
+    return _follow_response(request, author, False)
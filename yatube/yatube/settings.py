@@ -35,6 +35,7 @@ ALLOWED_HOSTS = [
 
 INSTALLED_APPS = [
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'core.apps.CoreConfig',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
@@ -48,15 +49,54 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы в total попадало время всех остальных
+    'core.timing.ServerTimingMiddleware',
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.replicas.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'posts.page_cache.PageCacheMiddleware',
 ]
 
+# Хуки core.timing для заголовка Server-Timing
+SERVER_TIMING = True
+# Доля запросов, разбивка которых пишется в лог yatube.timing
+SERVER_TIMING_LOG_SAMPLE = 0.01
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'timing': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'yatube.timing': {
+            'handlers': ['timing'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Файлы метрик воркеров (core.metrics); очищать при каждом деплое
+METRICS_DIR = os.getenv('YATUBE_METRICS_DIR') or os.path.join(
+    BASE_DIR, 'metrics'
+)
+# Токен для /metrics (Authorization: Bearer ...); без него — только
+# суперпользователи
+METRICS_TOKEN = os.getenv('YATUBE_METRICS_TOKEN')
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -90,6 +130,42 @@ DATABASES = {
     }
 }
 
+# Локальная реплика — копия db.sqlite3, которую обновляет sync_replica
+if os.getenv('YATUBE_SQLITE_REPLICA') == '1':
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.replicas.PrimaryReplicaRouter']
+# Базы для чтения; пустой список — всё идёт в default
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# Реплика, отставшая сильнее (секунды), не получает чтений
+REPLICA_MAX_LAG = 30
+# Как часто проверять отставание реплик, секунды
+REPLICA_CHECK_INTERVAL = 5
+# Сколько секунд после записи пользователь читает из основной базы
+REPLICA_PIN_SECONDS = 10
+
+# PRAGMA для каждого нового соединения с SQLite (см. core.db)
+SQLITE_PRAGMAS = {
+    # Читатели не блокируют писателя и друг друга
+    'journal_mode': 'WAL',
+    # Сколько миллисекунд ждать занятую базу вместо database is locked
+    'busy_timeout': 5000,
+    # В режиме WAL fsync только при checkpoint; данные не портятся
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КиБ, то есть 64 МБ на соединение
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+# Записи из вьюх выполняются по одной в отдельном потоке (core.db)
+SQLITE_WRITE_QUEUE = os.getenv('YATUBE_WRITE_QUEUE') == '1'
+# Сколько раз повторять транзакцию очереди, если база занята
+SQLITE_WRITE_RETRIES = 3
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -126,6 +202,13 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+# Сюда собирает статику manage.py build_static
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATICFILES_STORAGE = 'core.assets.AssetStorage'
+# CSS, из которых build_static убирает правила для неиспользуемых классов
+STATIC_PURGE_CSS = ['css/bootstrap.min.css']
+# Классы, которые не встречаются в шаблонах, но нужны (например, из кода)
+STATIC_PURGE_SAFELIST = []
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -138,12 +221,77 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 # Количество постов на странице
 PAGE_POSTS_COUNT = 10
+# Наибольший ?limit= в списках API
+API_MAX_LIMIT = 100
+# Сколько комментариев показывается за раз на странице поста
+COMMENTS_PAGE_SIZE = 20
+# Сколько записей хранится в ленте подписок каждого пользователя
+FEED_DEPTH = 500
+# Авторы с большим числом подписчиков читаются в ленту без fan-out
+FEED_FANOUT_LIMIT = 1000
+# Сколько строк выгрузка (posts.export) читает из БД за раз
+EXPORT_CHUNK_SIZE = 2000
+# Время, за которое вклад комментария в «обсуждаемое» падает вдвое, с
+TRENDING_HALF_LIFE = 6 * 60 * 60
+# Длина эпохи, относительно начала которой хранятся очки (см. trending)
+TRENDING_ERA = 7 * 24 * 60 * 60
+# Посты с меньшим текущим счётом compact_trending удаляет из таблицы
+TRENDING_MIN_SCORE = 0.05
+# Сколько постов показывает вкладка «Обсуждаемое»
+TRENDING_SIZE = 20
+# Сколько рекомендаций авторов хранится и сколько показывается
+RECOMMENDATIONS_DEPTH = 20
+RECOMMENDATIONS_SHOWN = 5
+# Время жизни фрагментов лент; актуальность обеспечивают версии ключей
+FEED_CACHE_TIMEOUT = 60 * 60
+# Наибольшее время ожидания новых записей в posts:live, секунды
+LIVE_TIMEOUT = 25
+# Как часто posts:live проверяет версии, изменённые другими процессами
+LIVE_POLL_INTERVAL = 0.5
+# Время жизни целых страниц в кеше (см. posts.page_cache)
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Миниатюры постов (ширина, высота), которые готовит фоновый воркер
+POST_THUMBNAILS = {
+    'feed': (960, 339),
+}
+# Сколько потоков обрабатывает картинки постов; 0 — прямо в запросе
+IMAGE_WORKERS = 2
+# Пост с новыми комментариями переиндексируется не чаще раза в столько
+# секунд (см. posts.search); 0 — сразу в запросе
+SEARCH_REINDEX_DELAY = 5
+
+# Ограничения на загружаемые картинки постов
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40_000_000
+# Большая сторона картинки после перекодирования воркером
+POST_IMAGE_MAX_SIDE = 1920
+# Загрузки сразу пишутся на диск по чанкам, см. posts.uploads
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.LimitedTemporaryFileUploadHandler',
+]
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-# бэкенд кеширования
-CACHES = {
-    'default': {
+# бэкенды кеширования; по умолчанию общий для всех воркеров файл SQLite
+# (тесты кладут его во временную папку, см. core.testing)
+CACHE_BACKENDS = {
+    'sqlite': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
 }
+CACHES = {
+    'default': CACHE_BACKENDS[
+        os.getenv('YATUBE_CACHE', 'sqlite')
+    ],
+}
+
+# manage.py test: временные файлы кеша и метрик, см. core.testing
+TEST_RUNNER = 'core.testing.TestRunner'
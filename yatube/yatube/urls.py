@@ -18,13 +18,20 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import asset, metrics
+
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
+    path('api/v1/', include('api.urls', namespace='api')),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    # Метрики для Prometheus; нужен токен или суперпользователь
+    path('metrics', metrics, name='metrics'),
+    # Собранная build_static статика; в DEBUG её раньше отдаёт runserver
+    path(settings.STATIC_URL.lstrip('/') + '<path:path>', asset),
 ]
 
 handler404 = 'core.views.page_not_found'